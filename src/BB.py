@@ -1,35 +1,207 @@
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from heapq import *
 import math
+import multiprocessing as mp
+from time import perf_counter
 
 class BBNode:
+    # what the node found while solving that can help solving the other
+    # nodes, like new columns, used by the parallel branch and bound
+    shared = ()
+
     def __lt__(self, bbnode):
         return self.obj < bbnode.obj
     
     def __iter__(self):
         yield self.obj
         yield self.solution
+        yield self.bound
+
+    def is_complete(self):
+        """A node is complete when its relaxation was solved to optimality,
+           so that its bound is its objective. An integer node that is not
+           complete is a solution, but its bound can be lower than the
+           objective of the best solution in its subtree."""
+
+        return self.bound >= self.obj - 1e-6
+
+    def is_pruned(self):
+        """A node is pruned when its lower bound shows that it can't improve
+           on the cutoff it was solved with."""
+
+        return False
+
+    def receive(self, shared):
+        """Gets, before solving, the list of what the nodes solved so far
+           have shared."""
+
+        pass
     
-def BB(root_bbnode):
+class OpenNodes:
+    """The open nodes of a branch and bound, which are popped best first
+       (the one with the lowest objective) or depth first (the last one
+       pushed), according to 'strategy'. Depth first dives down to integer
+       nodes quickly, which gives a cutoff early on large instances."""
+
+    def __init__(self, strategy='best'):
+        if strategy not in ('best', 'depth'):
+            raise ValueError(f"Unknown search strategy '{strategy}'")
+        self.depth_first = strategy == 'depth'
+        self.bbnodes = []
+
+    def __bool__(self):
+        return bool(self.bbnodes)
+
+    def push(self, bbnode):
+        if self.depth_first:
+            self.bbnodes.append(bbnode)
+        else:
+            heappush(self.bbnodes, bbnode)
+
+    def pop(self):
+        if self.depth_first:
+            return self.bbnodes.pop()
+        return heappop(self.bbnodes)
+
+    def bound(self):
+        """Returns the lowest bound of the open nodes."""
+
+        return min((bbnode.bound for bbnode in self.bbnodes), default=math.inf)
+
+def out_of_time(start, time_limit):
+    return time_limit is not None and perf_counter() - start >= time_limit
+
+def BB(root_bbnode, strategy='best', time_limit=None):
+    """Branch and bound from 'root_bbnode', exploring the open nodes in the
+       order given by 'strategy' (see OpenNodes). No node is split after
+       'time_limit' seconds, if given.
+
+       Returns:
+           A pair with the best integer node, or None if none was found, and
+           the lower bound on the objective: the objective of that node when
+           the search is complete, otherwise the lowest bound of the open
+           nodes, if it was stopped, and of the integer nodes that are not
+           complete (see 'BBNode.is_complete'). It's infinite if the problem
+           is infeasible.
+    """
+
+    start = perf_counter()
     min_obj = math.inf
     min_bbnode = None
-    priority_queue = []
-    solve_and_push(priority_queue, root_bbnode)
+    # the lowest bound of the integer nodes that are not complete
+    leaf_bound = math.inf
+    priority_queue = OpenNodes(strategy)
+    solve_and_push(priority_queue, root_bbnode, min_obj)
     while priority_queue:
-        bbnode = heappop(priority_queue)
+        if out_of_time(start, time_limit):
+            return min_bbnode, min(min_obj, leaf_bound,
+                                   priority_queue.bound())
+        bbnode = priority_queue.pop()
         if bbnode.is_integer():
             if bbnode.obj < min_obj:
                 min_bbnode = bbnode
                 min_obj = bbnode.obj
+            if not bbnode.is_complete():
+                leaf_bound = min(leaf_bound, bbnode.bound)
             continue
-        if bbnode.obj > min_obj:
+        if bbnode.bound >= min_obj:
             continue
-        left_bbnode, right_bbnode = bbnode.split()
-        solve_and_push(priority_queue, left_bbnode)
-        solve_and_push(priority_queue, right_bbnode)
-    return min_bbnode
-
-def solve_and_push(priority_queue, bbnode):
-    bbnode.solve()
-    if not bbnode.is_infeasible():
-        heappush(priority_queue, bbnode)
\ No newline at end of file
+        for child in bbnode.split():
+            solve_and_push(priority_queue, child, min_obj)
+    return min_bbnode, min(min_obj, leaf_bound)
+
+def solve_and_push(priority_queue, bbnode, cutoff):
+    bbnode.solve(cutoff)
+    if not bbnode.is_infeasible() and not bbnode.is_pruned():
+        priority_queue.push(bbnode)
+
+def parallel_BB(root_bbnode, processes, initializer=None, initargs=(),
+                strategy='best', time_limit=None):
+    """Branch and bound like BB, but up to 'processes' nodes are solved at
+       the same time, each one by a worker process. The workers are set up
+       by calling 'initializer' with 'initargs', so they can hold their own
+       copy of whatever the nodes need to be solved (nodes are pickled to
+       and from them).
+
+       The root node is solved in this process, then the next open node
+       (see OpenNodes) is split and its children are handed out to the idle
+       workers, with the best objective found so far as cutoff. Integer
+       nodes update it as soon as they are solved. What a node shares is
+       given to all the nodes handed out after it: it's kept in a list of a
+       manager process, from which each worker fetches only what was added
+       since its previous node, instead of getting all of it with every
+       node. After 'time_limit' seconds no node is handed out, and the
+       search stops when the running ones are solved. The result is the
+       same as BB's.
+    """
+
+    start = perf_counter()
+    min_obj = math.inf
+    min_bbnode = None
+    leaf_bound = math.inf
+    priority_queue = OpenNodes(strategy)
+
+    def collect(bbnode):
+        nonlocal min_obj, min_bbnode, leaf_bound
+        shared.extend(bbnode.shared)
+        if bbnode.is_infeasible() or bbnode.is_pruned():
+            return
+        if not bbnode.is_integer():
+            priority_queue.push(bbnode)
+            return
+        if bbnode.obj < min_obj:
+            min_bbnode = bbnode
+            min_obj = bbnode.obj
+        if not bbnode.is_complete():
+            leaf_bound = min(leaf_bound, bbnode.bound)
+
+    # solvers like Gurobi can't be used in a forked process
+    context = mp.get_context('spawn')
+    with context.Manager() as manager:
+        shared = manager.list()
+        root_bbnode.solve(min_obj)
+        collect(root_bbnode)
+        with ProcessPoolExecutor(processes, context, init_worker,
+                                 (shared, initializer, initargs)) as executor:
+            running = set()
+            while running or priority_queue and not out_of_time(
+                    start, time_limit):
+                while (priority_queue and len(running) < processes
+                       and not out_of_time(start, time_limit)):
+                    bbnode = priority_queue.pop()
+                    if bbnode.bound >= min_obj:
+                        continue
+                    for child in bbnode.split():
+                        running.add(executor.submit(solve_bbnode, child,
+                                                    min_obj))
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+    return min_bbnode, min(min_obj, leaf_bound, priority_queue.bound())
+
+# what the nodes have shared, as a list proxy, and how much of it the nodes
+# solved by this worker process have received
+worker_shared = None
+worker_received = 0
+
+def init_worker(shared, initializer, initargs):
+    """Sets up a worker process of parallel_BB."""
+
+    global worker_shared, worker_received
+    worker_shared = shared
+    worker_received = 0
+    if initializer is not None:
+        initializer(*initargs)
+
+def solve_bbnode(bbnode, cutoff):
+    """Solves 'bbnode' in a worker process of parallel_BB and returns it.
+       The node receives only what was shared since the previous node of
+       this worker, since the others are in its process already."""
+
+    global worker_received
+    new = worker_shared[worker_received:]
+    worker_received += len(new)
+    bbnode.receive(new)
+    bbnode.solve(cutoff)
+    return bbnode
@@ -0,0 +1,202 @@
+import numpy as np
+
+from ESPPRC import Label, ESP_Label, ESPPRC
+
+class BD_Label(ESP_Label):
+    """ESP Label used by the bidirectional algorithm. Besides the unreachable
+       customers, it keeps the bitmask of the customers visited, which is
+       needed to check that a forward and a backward path can be joined into
+       an elementary one (the unreachable customers can't be used for that,
+       since they contain also customers that are just too far away)."""
+
+    __slots__ = ('visited',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.visited = 1 << self.customer.index
+        if self.prev:
+            self.visited |= self.prev.visited
+
+class Backward_Label(BD_Label):
+    """Label of a path going from a customer back to the depot.
+       Its time is the latest time the service at its customer can start
+       while still reaching every following customer in time, so the more
+       the better and the time comparison in the dominance relation is
+       reversed. Its 'prev' is the next customer in the path."""
+
+    __slots__ = ()
+
+    def dominates(self, label):
+        return (self.cost <= label.cost and self.load <= label.load
+                and self.time >= label.time
+                and not self.unreachable_cs & ~label.unreachable_cs)
+
+class BD_ESPPRC(ESPPRC):
+    """Bidirectional ESPPRC algorithm. Forward labels are extended from the
+       depot only while their time doesn't exceed half of the depot time
+       horizon, backward labels are extended from the depot return only
+       while their time is past it. Since every path crosses the half of the
+       horizon once, it can be obtained by joining, along one of its arcs, a
+       forward label with a backward one. Both labeling runs explore paths
+       about half as long as the ones of the monodirectional algorithm, so
+       far fewer labels are generated on long routes.
+
+       Joins are only done on the arc where the forward path crosses the
+       half of the horizon, so each path is obtained at most once. For each
+       forward label and arc only the cheapest feasible join is kept, and
+       only if its reduced cost is negative (the best join is returned
+       anyway if there are none), together with the forward labels that
+       already reached the depot."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.label_cls = BD_Label
+        self.half_time = sum(self.depot.time_window) / 2
+        self.backward = False
+
+    def solve(self):
+        self.backward = False
+        self.label_cls = BD_Label
+        routes = super().solve()
+        forward = {customer: customer.labels for customer in self.customers}
+
+        self.backward = True
+        self.label_cls = Backward_Label
+        super().solve()
+        backward = {customer: customer.labels for customer in self.customers}
+        self.backward = False
+        self.label_cls = BD_Label
+
+        return self.joined_labels(forward, backward, routes)
+
+    def depot_label(self):
+        label = super().depot_label()
+        label.visited = 0
+        if self.backward:
+            label.time = self.depot.time_window[1]
+        return label
+
+    def candidates_mask(self, from_label):
+        if not self.backward:
+            return super().candidates_mask(from_label)
+
+        # extending backward goes through the arcs entering the customer
+        return (self.predecessors[from_label.customer.index]
+                & ~(from_label.unreachable_cs | 1 << from_label.customer.index))
+
+    def cut_off_mask(self, from_label):
+        if not self.backward:
+            return super().cut_off_mask(from_label)
+
+        index = from_label.customer.index
+        predecessors = self.reach_masks[1][index]
+        return self.customers_mask & ~(predecessors | 1 << self.depot.index
+                                       | 1 << index)
+
+    def set_completion_bounds(self, arcs):
+        if not self.backward:
+            return super().set_completion_bounds(arcs)
+
+        # a backward label is completed by a path from the depot to its
+        # customer, which is found by the same relaxation run forward, that
+        # is backward on the transposed graph with negated times
+        self.bound_sign = -1
+        self.bound_fronts = self.relaxed_fronts(
+            self.reduced_costs(arcs).T,
+            (self.service_times[:, None] + self.times).T,
+            -self.due_times, -self.ready_times)
+        return self.bound_fronts is not None
+
+    def feasible_labels_from(self, from_label):
+        if self.backward:
+            if from_label.time <= self.half_time:
+                return []
+        elif from_label.time > self.half_time:
+            return []
+        return super().feasible_labels_from(from_label)
+
+    def extended_resources(self, from_label):
+        if not self.backward:
+            return super().extended_resources(from_label)
+
+        # extending backward goes from 'to_cus' to 'from_cus', so costs
+        # and times are read by column and the dual of 'to_cus' is paid
+        from_cus = from_label.customer
+        loads = from_label.load + self.demands
+        times = np.minimum(from_label.time - self.service_times
+                                           - self.times[:, from_cus],
+                           self.due_times)
+        # the depot is never reached backward: paths leaving it are
+        # obtained by joining the depot label with the backward ones
+        times[self.depot] = np.inf
+        times[times < self.ready_times] = np.inf
+        costs = from_label.cost + self.costs[:, from_cus] - self.duals
+        return loads, times, costs
+
+    def joined_labels(self, forward, backward, routes):
+        """Arguments:
+               forward: a dictionary of forward labels for each customer
+               backward: a dictionary of backward labels for each customer
+               routes: the forward labels that already reached the depot
+           Returns:
+               A list of labels describing the joined paths, sorted by cost.
+        """
+
+        start_label = self.depot_label()
+        arcs = self.priced_arcs()
+        best_cost = routes[0].cost if routes else np.inf
+        best_join = None
+        joins = []
+        for from_cus in self.customers:
+            if from_cus is self.depot:
+                from_labels = [start_label]
+            else:
+                from_labels = [label for label in forward[from_cus]
+                               if label.time <= self.half_time]
+            for to_cus in self.customers:
+                if (to_cus is self.depot or to_cus is from_cus
+                    or not arcs[from_cus, to_cus]):
+                    continue
+                arc_cost = self.costs[from_cus, to_cus] - self.duals[from_cus]
+                arc_time = from_cus.service_time + self.times[from_cus, to_cus]
+                for f_label in from_labels:
+                    time = max(f_label.time + arc_time, to_cus.time_window[0])
+                    if time <= self.half_time:
+                        continue
+                    for b_label in backward[to_cus]:
+                        cost = f_label.cost + arc_cost + b_label.cost
+                        # backward labels are sorted by cost
+                        if cost >= max(best_cost, 0):
+                            break
+                        if (time > b_label.time
+                            or f_label.load + b_label.load > self.capacity
+                            or f_label.visited & b_label.visited):
+                            continue
+                        if cost < 0:
+                            joins.append((cost, f_label, b_label))
+                        if cost < best_cost:
+                            best_cost = cost
+                            best_join = (cost, f_label, b_label)
+                        # the other completions through this arc cost more
+                        break
+
+        labels = [label for label in routes if label.cost < 0]
+        labels.extend(self.joined_label(*join) for join in joins)
+        if not labels:
+            # there is no negative path, so only the cheapest one is returned
+            if best_join:
+                labels.append(self.joined_label(*best_join))
+            elif routes:
+                labels.append(routes[0])
+        return sorted(labels, key=lambda x: x.cost)
+
+    def joined_label(self, cost, f_label, b_label):
+        """Returns a label at the depot whose path is the one of 'f_label'
+           followed by the one of 'b_label'. Only its cost is meaningful."""
+
+        label = f_label
+        load = f_label.load + b_label.load
+        while b_label:
+            label = Label(b_label.customer, cost, load, b_label.time, label)
+            b_label = b_label.prev
+        return label
@@ -0,0 +1,118 @@
+import numpy as np
+
+def route_cost(vrptw, route):
+    """Returns the cost of 'route', a sequence of customer indices that
+       starts and ends at the depot."""
+
+    return float(vrptw.costs[route[:-1], route[1:]].sum(dtype=float))
+
+def is_feasible(vrptw, route):
+    """Returns True if 'route' respects the capacity and the time windows."""
+
+    customers = vrptw.customers
+    if sum(customers[index].demand for index in route) > vrptw.capacity:
+        return False
+    time = customers[route[0]].time_window[0]
+    for prev, index in zip(route, route[1:]):
+        if not vrptw.arcs[prev, index]:
+            return False
+        customer = customers[index]
+        time = max(time + customers[prev].service_time
+                   + vrptw.times[prev, index], customer.time_window[0])
+        if time > customer.time_window[1]:
+            return False
+    return True
+
+def savings_routes(vrptw):
+    """Builds a feasible set of routes with the Clarke and Wright savings
+       algorithm: it starts with a route for each customer and merges two
+       routes, the first one ending with i and the second one starting with
+       j, in decreasing order of the saving c(i, 0) + c(0, j) - c(i, j),
+       whenever the merged route is feasible.
+
+       Returns:
+           A list of routes, each one a list of customer indices that starts
+           and ends at the depot.
+    """
+
+    costs = vrptw.costs
+    n = len(vrptw.customers)
+    routes = {index: [0, index, 0] for index in range(1, n)
+              if is_feasible(vrptw, [0, index, 0])}
+    # the route each customer is in, by its first customer
+    route_of = {index: index for index in routes}
+
+    savings = costs[1:, :1] + costs[:1, 1:] - costs[1:, 1:]
+    pairs = np.argwhere(vrptw.arcs[1:, 1:] & (savings > 0))
+    order = np.argsort(-savings[pairs[:, 0], pairs[:, 1]], kind='stable')
+    for i, j in (pairs[order] + 1).tolist():
+        if i not in route_of or j not in route_of:
+            continue
+        first, second = route_of[i], route_of[j]
+        if (first == second or routes[first][-2] != i
+            or routes[second][1] != j):
+            continue
+        merged = routes[first][:-1] + routes[second][1:]
+        if is_feasible(vrptw, merged):
+            routes[first] = merged
+            del routes[second]
+            for index in merged[1:-1]:
+                route_of[index] = first
+    return list(routes.values())
+
+def relocate(vrptw, routes, max_passes=10):
+    """Improves 'routes' in place with a quick local search: each customer
+       is moved to the cheapest feasible position in any route, as long as
+       this lowers the total cost. Routes left empty are removed."""
+
+    costs = vrptw.costs
+    for _ in range(max_passes):
+        improved = False
+        for route in routes:
+            position = 1
+            while position < len(route) - 1:
+                index = route[position]
+                prev, next = route[position - 1], route[position + 1]
+                removal_saving = (costs[prev, index] + costs[index, next]
+                                  - costs[prev, next])
+                best = None
+                best_saving = 1e-9
+                for other in routes:
+                    for insert in range(1, len(other)):
+                        if other is route and insert in (position,
+                                                         position + 1):
+                            continue
+                        a, b = other[insert - 1], other[insert]
+                        saving = removal_saving - (costs[a, index]
+                                                   + costs[index, b]
+                                                   - costs[a, b])
+                        if saving <= best_saving:
+                            continue
+                        if other is route:
+                            moved = route[:position] + route[position + 1:]
+                            moved.insert(insert - (insert > position), index)
+                            if not is_feasible(vrptw, moved):
+                                continue
+                        elif not is_feasible(vrptw, other[:insert] + [index]
+                                                    + other[insert:]):
+                            continue
+                        best, best_saving = (other, insert), saving
+                if best:
+                    other, insert = best
+                    del route[position]
+                    if other is route and insert > position:
+                        insert -= 1
+                    other.insert(insert, index)
+                    improved = True
+                else:
+                    position += 1
+        routes[:] = [route for route in routes if len(route) > 2]
+        if not improved:
+            break
+    return routes
+
+def initial_routes(vrptw):
+    """Returns a feasible set of routes for 'vrptw', found by the savings
+       algorithm followed by a relocate local search."""
+
+    return relocate(vrptw, savings_routes(vrptw))
@@ -1,3 +1,7 @@
+import numpy as np
+from collections import Counter
+
+from ESPPRC import Label
 from SSR_SPPRC import SSR_Label, SSR_SPPRC
 
 def find_repeated(items):
@@ -22,15 +26,34 @@ class DSSR_Label(SSR_Label):
        Critical customers are customers that the algorithm previously find as
        repeated in the SSR SPPRC execution.
        The new resource doesn't allow to visit critical customers twice (but
-       only them), so it prevents the same cycle to appear again."""
+       only them), so it prevents the same cycle to appear again.
+       Like the unreachable customers, the critical customers visited are
+       stored as a bitmask.
+
+       The number of customers visited is not a resource of this relaxation,
+       so it's left out of the dominance (see Counting_DSSR_Label)."""
+
+    __slots__ = ('critical_visited',)
 
     def __init__(self, *args):
         super().__init__(*args)
-        self.critical_visited = set()
+        self.critical_visited = 0
     
+    def dominates(self, label):
+        return (Label.dominates(self, label)
+                and not self.critical_visited & ~label.critical_visited)
+
+class Counting_DSSR_Label(DSSR_Label):
+    """DSSR Label that also compares the number of customers visited, for the
+       instances where a path could visit as many customers as SSR_SPPRC
+       allows: a label that can't be extended any more must not dominate
+       one that can."""
+
+    __slots__ = ()
+
     def dominates(self, label):
         return (super().dominates(label)
-                and self.critical_visited.issubset(label.critical_visited))
+                and self.n_visited <= label.n_visited)
 
 class DSSR_ESPPRC(SSR_SPPRC):
     """Decremental state space relaxation ESPPRC algorithm. It starts by solving
@@ -39,32 +62,145 @@ class DSSR_ESPPRC(SSR_SPPRC):
        of those customers (called critical customers) and restart the algorithm.
        The DSSR labels used (see the respective documentation) prevent critical
        customers to be visited twice so the process is repeated until an acyclic
-       path is returned."""
+       path is returned.
 
-    def __init__(self, *args):
-        super().__init__(*args)
-        self.label_cls = DSSR_Label
-        self.critical_cs = set()
+       The algorithm returns the acyclic paths as soon as some of them have a
+       negative reduced cost, or when none of the cyclic ones has (then the
+       cheapest path is optimal). Otherwise it restarts with new critical
+       customers, chosen among the ones repeated in the cyclic paths with
+       negative reduced cost according to 'critical_rule': all of them
+       ('all', the default), which needs fewer restarts and column generation
+       iterations, or only the one repeated in most of them ('most'), which
+       keeps the relaxation as small as possible. The arcs and the
+       completion bounds for the duals are computed once for all the
+       restarts.
+
+       Critical customers are kept from one call to the next, since the same
+       cycles tend to come back in the next column generation iterations.
+       If 'max_critical_age' is given, the ones that haven't stopped any
+       label from visiting them again for more than that many calls are
+       removed, so that the critical set doesn't keep growing.
+
+       Since it can return before finding the cheapest elementary path, the
+       lower bound on its reduced cost is the one of the cheapest path of
+       the last relaxation (see 'min_reduced_cost').
+    """
+
+    def __init__(self, *args, critical_rule='all', max_critical_age=None,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        if critical_rule not in ('most', 'all'):
+            raise ValueError(f"Unknown critical rule '{critical_rule}'")
+        if self.max_visits() < self.n_customers:
+            self.label_cls = DSSR_Label
+        else:
+            self.label_cls = Counting_DSSR_Label
+        self.critical_rule = critical_rule
+        self.max_critical_age = max_critical_age
+        # bitmask of the critical customers, the calls since each of them,
+        # by index, last stopped a label from visiting it again, and the
+        # bitmask of the ones that did in the current call
+        self.critical_cs = 0
+        self.critical_ages = {}
+        self.blocked_cs = 0
+        # the cost of the cheapest path of the last relaxation
+        self.relaxed_min = 0
 
     def solve(self):
-        labels = super().solve()
-        
-        def acyclic_labels():
+        stats = self.label_stats
+        n_critical = bin(self.critical_cs).count('1')
+        self.prepare()
+        self.blocked_cs = 0
+        while True:
+            labels = self.extend_labels()
+            self.relaxed_min = labels[0].cost if labels else 0
+            acyclic_labels = []
+            repeated_counts = Counter()
             for label in labels:
                 repeated = find_repeated(label.path[:-1])
-                if repeated:
-                    self.critical_cs.update(repeated)
+                if not repeated:
+                    acyclic_labels.append(label)
+                elif label.cost < -1e-9:
+                    repeated_counts.update(customer.index
+                                           for customer in repeated)
+            if repeated_counts:
+                if self.critical_rule == 'most':
+                    # ties go to the customers of the cheapest paths
+                    new_critical = [repeated_counts.most_common(1)[0][0]]
                 else:
-                    yield label
-        
-        return list(acyclic_labels())
-    
-    def extended_label(self, from_label, to_cus):
-        label = super().extended_label(from_label, to_cus)
-        if not label or to_cus in from_label.critical_visited:
-           return
-
-        label.critical_visited.update(from_label.critical_visited)
-        if to_cus in self.critical_cs:
-            label.critical_visited.add(to_cus)
-        return label
\ No newline at end of file
+                    new_critical = list(repeated_counts)
+                for index in new_critical:
+                    self.critical_cs |= 1 << index
+            # if only cyclic paths have a negative reduced cost the algorithm
+            # is restarted with the new critical customers
+            if (not repeated_counts or acyclic_labels
+                    and acyclic_labels[0].cost < -1e-9):
+                break
+            if stats is not None:
+                stats['restarts'] += 1
+
+        removed = self.age_critical()
+        if stats is not None:
+            stats['critical'] = bin(self.critical_cs).count('1')
+            stats['new critical'] = stats['critical'] - n_critical + removed
+            stats['removed critical'] = removed
+        return acyclic_labels
+
+    def age_critical(self):
+        """Updates the ages of the critical customers after a call and
+           removes the ones older than 'max_critical_age' from the critical
+           set. Returns the number of customers removed."""
+
+        ages = {}
+        removed = 0
+        for index in range(self.n_customers):
+            if not self.critical_cs >> index & 1:
+                continue
+            age = 0
+            if not self.blocked_cs >> index & 1:
+                age = self.critical_ages.get(index, 0) + 1
+            if (self.max_critical_age is not None
+                    and age > self.max_critical_age):
+                self.critical_cs &= ~(1 << index)
+                removed += 1
+            else:
+                ages[index] = age
+        self.critical_ages = ages
+        return removed
+
+    def max_visits(self):
+        """Returns an upper bound on the number of customers a path can
+           visit: the most customers whose smallest demands fit in the
+           capacity, and one more than the most customers whose shortest
+           times to go to another customer fit in the depot time window."""
+
+        others = np.arange(self.n_customers) != self.depot.index
+        loads = np.cumsum(np.sort(self.demands[others]))
+        durations = np.where(self.arcs,
+                             self.service_times[:, None] + self.times,
+                             np.inf)[others][:, others]
+        times = np.cumsum(np.sort(durations.min(axis=1, initial=np.inf)))
+        horizon = (self.due_times[self.depot.index]
+                   - self.ready_times[self.depot.index])
+        return min(np.count_nonzero(loads <= self.capacity),
+                   np.count_nonzero(times <= horizon) + 1)
+
+    def min_reduced_cost(self, labels):
+        return self.relaxed_min
+
+    def candidates_mask(self, from_label):
+        # critical customers can't be visited twice
+        candidates = super().candidates_mask(from_label)
+        self.blocked_cs |= candidates & from_label.critical_visited
+        return candidates & ~from_label.critical_visited
+
+    def new_label(self, from_label, to_cus, *args):
+        label = super().new_label(from_label, to_cus, *args)
+        if not label:
+            return
+
+        label.critical_visited = from_label.critical_visited
+        bit = 1 << to_cus.index
+        if self.critical_cs & bit:
+            label.critical_visited |= bit
+        return label
@@ -0,0 +1,244 @@
+import numpy as np
+import scipy.spatial.distance as sp
+from time import perf_counter
+
+from Construction import is_feasible, route_cost
+from DSSR_ESPPRC import DSSR_ESPPRC
+from Loader import distance_matrix, load
+from Master import GurobiMaster
+from VRPTW import VRPTW
+
+class DynamicVRPTW:
+    """A VRPTW instance whose customers, fleet size, demands and time windows
+       change over time, re-optimized after each batch of changes from what
+       the previous solves found instead of from scratch.
+
+       Customers are identified by an id, their index in the instance file
+       (the depot is 0), which doesn't change when others are added or
+       removed. Each solve builds a VRPTW with the current customers in
+       order of id (see 'build'), whose master problem starts with the
+       columns of the previous solve that are still feasible: the ones that
+       visit a removed customer are dropped right away, and the ones that
+       visit a customer whose demand or time window changed are checked
+       again. The columns that were in the column pool go back to the pool.
+       The critical customers of the DSSR solver are kept too, so that it
+       doesn't have to find them again. The distances between customers are
+       computed only when they are added, the ones of the initial customers
+       all at once.
+
+       When only the fleet size changed since the last solve, the VRPTW of
+       the last solve, with its master problem and its basis, is solved
+       again as it is.
+
+       Arguments:
+           vehicles: number of vehicles available
+           capacity: maximum capacity of each vehicle
+           data: the customer lines, depot first: id, x and y coordinates,
+                 demand, ready time, due date and service time (see
+                 'Loader.parse')
+           master_cls: the class of the master problem (see Master)
+           espprc_cls: the ESPPRC solver class, built with 'espprc_args'
+                       (see 'VRPTW.set_espprc_solver')
+           distances: the distance matrix of the customers of 'data', in
+                      their order, computed from their coordinates if not
+                      given
+       Attributes:
+           limits: the column generation limits of the VRPTW solved, like
+                   'time_limit' or 'max_gap' (see VRPTW)
+    """
+
+    @staticmethod
+    def from_file(filename, **kwargs):
+        """Create a DynamicVRPTW from a text file in the Solomon format. The
+           keyword arguments are the ones of the constructor."""
+
+        vehicles, capacity, data, costs = load(filename)
+        return DynamicVRPTW(vehicles, capacity, data, distances=costs,
+                            **kwargs)
+
+    def __init__(self, vehicles, capacity, data, master_cls=GurobiMaster,
+                 espprc_cls=DSSR_ESPPRC, distances=None, **espprc_args):
+        self.vehicles = vehicles
+        self.capacity = capacity
+        self.master_cls = master_cls
+        self.espprc_cls = espprc_cls
+        self.espprc_args = espprc_args
+        self.limits = {}
+        # the customer lines by id, and the distances between all of the
+        # customers ever added: 'rows' has the row of each id in the matrix
+        # and 'locations' the location of each row
+        data = np.asarray(data).tolist()
+        self.lines = {int(line[0]): [int(line[0])] + line[1:]
+                      for line in data}
+        if len(self.lines) < len(data):
+            raise ValueError("the customer ids must be unique")
+        self.rows = {id: row for row, id in enumerate(self.lines)}
+        self.locations = [line[1:3] for line in data]
+        if distances is None:
+            distances = distance_matrix(np.reshape(self.locations, (-1, 2)))
+        self.distances = np.asarray(distances)
+        # the paths of the columns of the master problem and of the pool, as
+        # tuples of ids, and the ids of the critical customers of DSSR
+        self.columns = set()
+        self.pool = set()
+        self.critical = set()
+        # the customers whose demand or time window changed since the last
+        # solve, the columns dropped since then, and the VRPTW of the last
+        # solve with its customer ids in order (None when it's stale)
+        self.changed = set()
+        self.dropped = 0
+        self.vrptw = None
+        self.ids = []
+        self.stats = {}
+
+    def add_customer(self, id, x, y, demand, ready_time, due_date,
+                     service_time):
+        """Adds the customer 'id', or replaces it if it exists already."""
+
+        id = int(id)
+        if id in self.lines:
+            self.remove_customer(id)
+        # the distances of a customer added again are computed again only if
+        # it moved
+        if id not in self.rows or self.locations[self.rows[id]] != [x, y]:
+            n = len(self.locations)
+            distances = np.zeros((n + 1, n + 1))
+            distances[:n, :n] = self.distances
+            if n:
+                distances[n, :n] = distances[:n, n] = sp.cdist(
+                    [[x, y]], self.locations)[0]
+            self.distances = distances
+            self.rows[id] = n
+            self.locations.append([x, y])
+        self.lines[id] = [id, x, y, demand, ready_time, due_date, service_time]
+        self.vrptw = None
+
+    def remove_customer(self, id):
+        """Removes the customer 'id' and the columns that visit it."""
+
+        self.check_customer(id)
+        if id == 0:
+            raise ValueError("the depot can't be removed")
+        del self.lines[id]
+        for paths in (self.columns, self.pool):
+            visiting = {path for path in paths if id in path}
+            paths.difference_update(visiting)
+            self.dropped += len(visiting)
+        self.critical.discard(id)
+        self.changed.discard(id)
+        self.vrptw = None
+
+    def set_demand(self, id, demand):
+        self.check_customer(id)
+        self.lines[id][3] = demand
+        self.changed.add(id)
+        self.vrptw = None
+
+    def set_time_window(self, id, ready_time, due_date):
+        self.check_customer(id)
+        self.lines[id][4:6] = [ready_time, due_date]
+        self.changed.add(id)
+        self.vrptw = None
+
+    def set_vehicles(self, vehicles):
+        """Sets the fleet size. The last VRPTW solved is kept."""
+
+        self.vehicles = vehicles
+
+    def check_customer(self, id):
+        if id not in self.lines:
+            raise KeyError(f"no customer {id}")
+
+    def build(self):
+        """Builds the VRPTW of the current customers, whose indices are
+           their positions in order of id, with the columns kept from the
+           previous solves (see the class documentation).
+
+           Returns:
+               The VRPTW, with its master problem and pricing solver.
+        """
+
+        ids = sorted(self.lines)
+        index = {id: i for i, id in enumerate(ids)}
+        data = [[index[id]] + self.lines[id][1:] for id in ids]
+        rows = [self.rows[id] for id in ids]
+        vrptw = VRPTW.from_data(self.vehicles, self.capacity, data,
+                                self.distances[np.ix_(rows, rows)])
+        for limit, value in self.limits.items():
+            setattr(vrptw, limit, value)
+        # the heuristic routes are only needed when starting from scratch
+        vrptw.init_model(self.master_cls, construct=not self.columns)
+        vrptw.set_espprc_solver(self.espprc_cls, **self.espprc_args)
+
+        for paths, in_pool in ((self.columns, False), (self.pool, True)):
+            for path in paths:
+                route = [index[id] for id in path]
+                # only the columns of the changed customers can have become
+                # infeasible
+                if (self.changed.intersection(path)
+                        and not is_feasible(vrptw, route)):
+                    self.dropped += 1
+                    continue
+                path = tuple(route)
+                if path in vrptw.paths:
+                    continue
+                if in_pool:
+                    vrptw.pool[path] = route_cost(vrptw, route)
+                else:
+                    vrptw.add_column(path, route_cost(vrptw, route))
+                # pool paths too, since they can go back to the master
+                vrptw.path_stages[path] = 'warm'
+        if hasattr(vrptw.espprc, 'critical_cs'):
+            vrptw.espprc.critical_cs = sum(1 << index[id]
+                                           for id in self.critical)
+        self.ids = ids
+        self.changed = set()
+        return vrptw
+
+    def solve(self, bb=False):
+        """Solves the problem with the current customers and fleet size, by
+           column generation, or by branch and price if 'bb' is True (see
+           'VRPTW.bb_solve'), starting from what the previous solves found.
+           The statistics of the solve are in 'stats': the ones of the VRPTW
+           (see 'VRPTW.init_model'), whether it was 'warm' (only the fleet
+           size changed), the columns the master problem started with and
+           the ones 'dropped' since the previous solve.
+
+           Returns:
+               None if the problem is infeasible, otherwise a tuple with the
+               objective, the paths used, as tuples of customer ids, with
+               their costs and values, and the best lower bound found (see
+               'VRPTW.solve').
+        """
+
+        start = perf_counter()
+        warm = self.vrptw is not None
+        if warm:
+            vrptw = self.vrptw
+            vrptw.vehicles = self.vehicles
+            vrptw.set_arc_branches(())
+            vrptw.master.set_vehicles(0, self.vehicles)
+            vrptw.stats = dict.fromkeys(vrptw.stats, 0)
+        else:
+            vrptw = self.build()
+        columns = len(vrptw.paths)
+        results = vrptw.bb_solve() if bb else vrptw.solve()
+
+        ids = self.ids
+        self.columns = {tuple(ids[index] for index in path)
+                        for path in vrptw.paths}
+        self.pool = {tuple(ids[index] for index in path)
+                     for path in vrptw.pool}
+        critical_cs = getattr(vrptw.espprc, 'critical_cs', 0)
+        self.critical = {id for i, id in enumerate(ids)
+                         if critical_cs >> i & 1}
+        self.vrptw = vrptw
+        self.stats = dict(vrptw.stats, warm=warm, columns=columns,
+                          dropped=self.dropped,
+                          time=perf_counter() - start)
+        self.dropped = 0
+        if not results:
+            return
+        obj, paths, bound = results
+        return obj, [(tuple(ids[index] for index in path), cost, value)
+                     for path, cost, value in paths], bound
@@ -1,6 +1,7 @@
+import heapq
 import numpy as np
+from bisect import bisect_left, bisect_right
 from collections import deque
-from functools import lru_cache
 
 class Label:
     """A label describes a path from the depot to a customer and the resources
@@ -18,15 +19,24 @@ class Label:
            cost: the accumulated cost
            load: the accumulated load
            time: the time spent
+           unreachable_cs: bitmask of the customers that can't be reached
+                           (bit i is set for the customer of index i)
            prev: the previous label (used for path reconstruction)
+
+       Many labels are created by each run of the algorithms, so labels use
+       slots instead of a dictionary for their attributes, and subclasses
+       must declare theirs in '__slots__' too.
     """
 
+    __slots__ = ('customer', 'cost', 'load', 'time', 'unreachable_cs', 'prev',
+                 'dominated')
+
     def __init__(self, customer, cost, load, time, prev=None):
         self.customer = customer
         self.cost = cost
         self.load = load
         self.time = time
-        self.unreachable_cs = set()
+        self.unreachable_cs = 0
         self.prev = prev
         self.dominated = False
 
@@ -34,9 +44,9 @@ class Label:
         return f"{(self.customer, self.cost, self.load, self.time)}"
 
     @property
-    @lru_cache(maxsize=1)
     def path(self):
-        """Returns the path described by this label."""
+        """Returns the path described by this label, following the chain of
+           previous labels (it's not stored, to save memory)."""
 
         label = self
         path = []
@@ -69,40 +79,94 @@ class Label:
         """Returns True if this label is dominated by any of the labels
            associated with the same customer, False otherwise."""
 
-        for label in self.customer.labels:
-            if label.dominates(self):
-                return True
-        return False
+        return self.customer.labels.dominating(self) is not None
 
     def filter_dominated(self):
         """Removes labels dominated by this label on its customer."""
 
-        labels = []
-        for label in self.customer.labels:
-            if self.dominates(label):
-                # label can be already in the 'to_be_extended' queue
-                # so we need to signal that this label is no more extendable
-                label.dominated = True
+        self.customer.labels.remove_dominated_by(self)
+
+class LabelBucket:
+    """The labels associated with a customer, kept sorted by cost.
+
+       Since the cost is one of the resources compared by every dominance
+       relation, a label can only be dominated by labels that cost less than
+       or the same as it, and it can only dominate labels that cost more than
+       or the same as it. So dominance checks only need to scan a prefix or a
+       suffix of the bucket, found by binary search on the costs.
+       Iterating over a bucket yields its labels by increasing cost.
+    """
+
+    def __init__(self):
+        self.labels = []
+        self.costs = []
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, label):
+        """Inserts 'label' keeping the bucket sorted. Labels with the same
+           cost are kept in insertion order."""
+
+        i = bisect_right(self.costs, label.cost)
+        self.costs.insert(i, label.cost)
+        self.labels.insert(i, label)
+
+    def dominating(self, label):
+        """Returns a label of the bucket that dominates 'label', or None if
+           there is not any."""
+
+        for i in range(bisect_right(self.costs, label.cost)):
+            if self.labels[i].dominates(label):
+                return self.labels[i]
+
+    def truncate(self, size):
+        """Removes the most expensive labels so that at most 'size' are
+           left."""
+
+        for other in self.labels[size:]:
+            other.dominated = True
+        del self.labels[size:]
+        del self.costs[size:]
+
+    def remove_dominated_by(self, label):
+        """Removes the labels of the bucket that are dominated by 'label'."""
+
+        start = bisect_left(self.costs, label.cost)
+        kept = []
+        for other in self.labels[start:]:
+            if label.dominates(other):
+                # other can be already in the 'to_be_extended' queue
+                # so we need to signal that it is no more extendable
+                other.dominated = True
             else:
-                labels.append(label)
-        self.customer.labels = labels
+                kept.append(other)
+        if len(kept) < len(self.labels) - start:
+            self.labels[start:] = kept
+            self.costs[start:] = [other.cost for other in kept]
 
 class ESP_Label(Label):
     """Extension of base Label used to describe elementary paths only.
-       To do that the unreachable customers set contains also the visited
+       To do that the unreachable customers mask contains also the visited
        customers and it is used as a resource, meaning that the dominance
        relation is also extended."""
 
+    __slots__ = ()
+
     def __init__(self, *args):
         super().__init__(*args)
-        self.unreachable_cs.add(self.customer)
+        self.unreachable_cs |= 1 << self.customer.index
     
     def dominates(self, label):
         # Note that having the unreachable customers set as a resource means
         # that a label uses less of this resource if it possesses a subset of
-        # the other's unreachable customers set.
+        # the other's unreachable customers set, i.e. if it has no bit set
+        # that the other's mask hasn't.
         return (super().dominates(label)
-                and self.unreachable_cs.issubset(label.unreachable_cs))
+                and not self.unreachable_cs & ~label.unreachable_cs)
 
 class ESPPRC:
     """The Elementary Shortest Path Problem with Resource Constraints
@@ -118,11 +182,40 @@ class ESPPRC:
            customers: a list of Customer objects
            costs: a matrix of costs of each arc
            times: a matrix of times needed for each arc
+           arcs: the boolean matrix of the arcs that paths can use, all of
+                 them if not given (see VRPTW.preprocess)
+           max_labels: if given, at most this many labels (the cheapest ones)
+                       are kept on each customer
+           max_arcs: if given, only this many arcs leave each customer, the
+                     ones with the lowest reduced cost (arcs from and to the
+                     depot are always kept)
+           completion_bounds: if True, labels that can't reach the depot
+                              with a negative reduced cost are discarded
+                              (see 'completion_bound')
+       'max_labels' and 'max_arcs' turn the algorithm into a heuristic, that
+       can be used to quickly find paths with negative reduced cost.
+
+       If 'label_stats' is not None (see 'reset_label_stats'), every run of
+       the algorithm adds its counters to it: the labels created, dominated
+       (discarded on arrival or before being extended), cut by the
+       completion bounds and extended at each customer, as lists indexed by
+       customer index, and the peak size of the queue of labels to extend.
+       Counting is skipped, at no cost, when it's None.
+
+       Customers are identified by their index, which is also their position
+       in the bitmasks used by labels to store sets of customers and in the
+       arrays of demands, time windows and service times used to extend a
+       label to all of its successors at once.
     """
 
-    def __init__(self, capacity, customers, costs, times):
+    def __init__(self, capacity, customers, costs, times, arcs=None,
+                 max_labels=None, max_arcs=None, completion_bounds=True):
         self.capacity = capacity
         self.customers = set(customers)
+        self.customers_by_index = {customer.index: customer
+                                   for customer in customers}
+        self.customers_mask = sum(1 << customer.index
+                                  for customer in customers)
         self.costs = costs
         self.times = times
         self.depot = customers[0]
@@ -130,36 +223,259 @@ class ESPPRC:
         self.n_customers = len(customers)
         self.label_cls = ESP_Label
 
+        by_index = [self.customers_by_index[i]
+                    for i in range(self.n_customers)]
+        self.demands = np.array([customer.demand for customer in by_index])
+        # times are floats even with integer distances and windows, so that
+        # infinity can mark the customers that can't be reached
+        self.ready_times = np.array([customer.time_window[0]
+                                     for customer in by_index], dtype=float)
+        self.due_times = np.array([customer.time_window[1]
+                                   for customer in by_index], dtype=float)
+        self.service_times = np.array([customer.service_time
+                                       for customer in by_index], dtype=float)
+        self.mask_bytes = (self.n_customers + 7) // 8
+
+        self.max_labels = max_labels
+        self.max_arcs = max_arcs
+        self.completion_bounds = completion_bounds
+        self.label_stats = None
+        if arcs is None:
+            arcs = np.ones((self.n_customers, self.n_customers), dtype=bool)
+        self.arcs = arcs
+        # the successors and predecessors of the arcs that are always
+        # available are computed only once
+        self.arcs_masks = self.arc_masks(arcs)
+        # the ones of the feasible arcs, which don't change with 'set_arcs'
+        self.reach_masks = self.arcs_masks
+
+    def set_arcs(self, arcs):
+        """Sets the boolean matrix of the arcs that paths can use, which must
+           be a subset of the ones given to the constructor, like when a
+           branch and bound forbids some of them. Customers can still be
+           reached through the arcs left out here (see 'cut_off_mask')."""
+
+        self.arcs = arcs
+        self.arcs_masks = self.arc_masks(arcs)
+
+    def reset_label_stats(self):
+        """Starts counting labels from zero (see the class documentation).
+           Subclasses that restart the algorithm count the restarts in
+           'restarts'."""
+
+        n = self.n_customers
+        self.label_stats = {'created': [0] * n, 'dominated': [0] * n,
+                            'bounded': [0] * n, 'extended': [0] * n,
+                            'peak queue': 0, 'restarts': 0}
+
     def solve(self):
+        self.prepare()
+        return self.extend_labels()
+
+    def prepare(self):
+        """Computes what the labeling needs for the current duals: the masks
+           of the arcs it can use and the completion bounds. Algorithms that
+           run the labeling more than once for the same duals compute them
+           only once."""
+
+        arcs = self.priced_arcs()
+        if arcs is self.arcs:
+            self.successors, self.predecessors = self.arcs_masks
+        else:
+            self.successors, self.predecessors = self.arc_masks(arcs)
+        self.bounded = (self.completion_bounds
+                        and self.set_completion_bounds(arcs))
+
+    def extend_labels(self):
+        """Extends the labels from the depot until none is left to extend
+           (see 'prepare').
+
+           Returns:
+               The labels that went back to the depot, sorted by cost.
+        """
+
+        stats = self.label_stats
+        if stats is not None:
+            created, dominated = stats['created'], stats['dominated']
+            bounded_cs, extended = stats['bounded'], stats['extended']
+        bounded = self.bounded
         for customer in self.customers:
-            customer.labels = []
+            customer.labels = LabelBucket()
         to_be_extended = deque([self.depot_label()])
         while to_be_extended:
+            if stats is not None:
+                stats['peak queue'] = max(stats['peak queue'],
+                                          len(to_be_extended))
             from_label = to_be_extended.popleft()
             # if a label becomes dominated after being pushed in the queue,
             # label.dominated becomes true and it can be skipped
             if from_label.dominated:
+                if stats is not None:
+                    dominated[from_label.customer.index] += 1
                 continue
             
             to_labels = self.feasible_labels_from(from_label)
+            if stats is not None:
+                extended[from_label.customer.index] += 1
+                for to_label in to_labels:
+                    created[to_label.customer.index] += 1
             for to_label in to_labels:
                 to_cus = to_label.customer
                 if to_cus is not self.depot:
-                    to_label.unreachable_cs.update(from_label.unreachable_cs)
+                    to_label.unreachable_cs |= from_label.unreachable_cs
+                    if bounded and self.completion_bound(to_label) >= 0:
+                        if stats is not None:
+                            bounded_cs[to_cus.index] += 1
+                        continue
                     if to_label.is_dominated():
+                        if stats is not None:
+                            dominated[to_cus.index] += 1
                         continue
                     to_label.filter_dominated()
                     to_be_extended.append(to_label)
-                to_cus.labels.append(to_label)
+                to_cus.labels.add(to_label)
+                if self.max_labels and to_cus is not self.depot:
+                    to_cus.labels.truncate(self.max_labels)
+
+        return list(self.depot.labels)
+
+    def min_reduced_cost(self, labels):
+        """Returns the lowest reduced cost of the paths for the current duals,
+           given the 'labels' returned by the last run of the algorithm, or a
+           lower bound on it for the algorithms that can return before
+           finding the cheapest path (0 if there are no paths)."""
+
+        return labels[0].cost if labels else 0
+
+    def priced_arcs(self):
+        """Returns the boolean matrix of the arcs that the labels can go
+           through in this run of the algorithm: all of them, or only the
+           cheapest ones according to the current duals if 'max_arcs' is
+           given."""
+
+        if not self.max_arcs or self.max_arcs >= self.n_customers - 1:
+            return self.arcs
 
-        return sorted(self.depot.labels, key=lambda x: x.cost)
+        reduced_costs = self.reduced_costs(self.arcs)
+        cheapest = np.argpartition(reduced_costs, self.max_arcs, axis=1)
+        arcs = np.zeros_like(self.arcs)
+        np.put_along_axis(arcs, cheapest[:, :self.max_arcs], True, axis=1)
+        arcs[self.depot] = True
+        arcs[:, self.depot] = True
+        return arcs & self.arcs
+
+    def reduced_costs(self, arcs):
+        """Returns the matrix of the reduced costs of the arcs for the current
+           duals. Arcs that are not in the boolean matrix 'arcs', and loops,
+           cost infinity."""
+
+        reduced_costs = np.where(arcs, self.costs - self.duals[:, None],
+                                 np.inf)
+        np.fill_diagonal(reduced_costs, np.inf)
+        return reduced_costs
+
+    def set_completion_bounds(self, arcs):
+        """Computes, for the current duals, the fronts used by
+           'completion_bound': for each customer, the reduced costs of the
+           cheapest paths from it to the depot, depending on the latest time
+           the service at the customer can start.
+           They are found by a backward SPPRC that keeps the time windows but
+           relaxes the capacity and the elementarity, so they bound the
+           completions of every label type, and its labels only have a cost
+           and a time, so it's much cheaper than the ESPPRC.
+
+           Arguments:
+               arcs: the boolean matrix of the arcs that can be used
+           Returns:
+               False if the bounds can't be computed (the relaxation might
+               not end if some arc takes no time), True otherwise.
+        """
+
+        self.bound_sign = 1
+        self.bound_fronts = self.relaxed_fronts(
+            self.reduced_costs(arcs), self.service_times[:, None] + self.times,
+            self.ready_times, self.due_times)
+        return self.bound_fronts is not None
+
+    def relaxed_fronts(self, reduced_costs, durations, lower, upper):
+        """Solves the relaxed SPPRC of 'set_completion_bounds' backward from
+           the depot: a path from customer j is extended to customer i
+           through the arc (i, j), whose reduced cost and duration are
+           'reduced_costs'[i, j] and 'durations'[i, j], and the time at i
+           is the latest start min(upper[i], time at j - duration), which
+           must not be less than lower[i].
+           Passing transposed matrices and negated time windows, the same
+           algorithm solves the forward relaxation.
+
+           Returns:
+               A list, indexed by customer index, of (times, costs) pairs of
+               lists sorted by time, where costs[k] is the cost of the
+               cheapest path that can start at any time after times[k - 1]
+               and not after times[k]. None if some usable arc takes no
+               time.
+        """
+
+        # the depot is only where paths end
+        usable = np.isfinite(reduced_costs)
+        usable[self.depot] = False
+        if (durations[usable] <= 0).any():
+            return
+
+        fronts = [([], []) for _ in range(self.n_customers)]
+        fronts[self.depot.index] = ([upper[self.depot]], [0])
+        # labels are extended by decreasing time, so each label popped from
+        # the heap can only be dominated by labels already in the fronts
+        heap = [(-upper[self.depot], 0, self.depot.index)]
+        while heap:
+            time, cost, index = heapq.heappop(heap)
+            time = -time
+            times, costs = fronts[index]
+            k = bisect_left(times, time)
+            if k == len(times) or times[k] != time or costs[k] != cost:
+                continue
+
+            new_times = np.minimum(upper, time - durations[:, index])
+            new_costs = cost + reduced_costs[:, index]
+            feasible = (new_times >= lower) & usable[:, index]
+            for i in np.flatnonzero(feasible).tolist():
+                new_time, new_cost = new_times[i], new_costs[i]
+                times, costs = fronts[i]
+                k = bisect_left(times, new_time)
+                if k < len(times) and costs[k] <= new_cost:
+                    continue
+                # remove the paths that start earlier and cost more
+                end = bisect_right(times, new_time)
+                start = bisect_left(costs, new_cost, 0, end)
+                times[start:end] = [new_time]
+                costs[start:end] = [new_cost]
+                heapq.heappush(heap, (-new_time, new_cost, i))
+        return fronts
+
+    def completion_bound(self, label):
+        """Returns a lower bound on the reduced cost of any path that extends
+           'label' to the depot (see 'set_completion_bounds')."""
+
+        times, costs = self.bound_fronts[label.customer.index]
+        k = bisect_left(times, self.bound_sign * label.time)
+        if k == len(times):
+            return np.inf
+        return label.cost + costs[k]
+
+    def arc_masks(self, arcs):
+        """Returns the lists of bitmasks, indexed by customer index, of the
+           successors and of the predecessors of each customer in the boolean
+           matrix 'arcs'."""
+
+        successors = [self.array_to_mask(row) for row in arcs]
+        predecessors = [self.array_to_mask(column) for column in arcs.T]
+        return successors, predecessors
 
     def depot_label(self):
         """Returns the algorithm starting label. It has no resources and its
            path can return to the depot."""
 
         label = self.label_cls(self.depot, 0, 0, 0)
-        label.unreachable_cs.clear()
+        label.unreachable_cs = 0
         return label
 
     def feasible_labels_from(self, from_label):
@@ -170,40 +486,96 @@ class ESPPRC:
            Note: 'from_label' unreachable set is updated in the process.
         """
 
+        from_label.unreachable_cs |= self.cut_off_mask(from_label)
+        candidates = self.candidates_mask(from_label)
+        if not candidates:
+            return []
+
+        # resources are computed for every customer at once, then only the
+        # candidates within the limits are turned into labels
+        loads, times, costs = self.extended_resources(from_label)
+        is_candidate = self.mask_to_array(candidates)
+        feasible = (is_candidate & (loads <= self.capacity)
+                                 & (times <= self.due_times))
+        from_label.unreachable_cs |= self.array_to_mask(is_candidate
+                                                        & ~feasible)
         to_labels = []
-        for to_cus in (self.customers - from_label.unreachable_cs
-                                      - {from_label.customer}):
-            to_label = self.extended_label(from_label, to_cus)
+        indices = np.flatnonzero(feasible)
+        for index, cost, load, time in zip(indices.tolist(),
+                                           costs[indices].tolist(),
+                                           loads[indices].tolist(),
+                                           times[indices].tolist()):
+            to_cus = self.customers_by_index[index]
+            to_label = self.new_label(from_label, to_cus, cost, load, time)
             if not to_label:
-                from_label.unreachable_cs.add(to_cus)
+                from_label.unreachable_cs |= 1 << index
             else:
                 to_labels.append(to_label)
         return to_labels
 
-    def extended_label(self, from_label, to_cus):
-        """Returns a new label that extends 'from_label' and goes to 'to_cus'.
-           
-           Arguments:
-               from_label: the label to start from
-               to_cus: the customer to reach
-           Returns:
-               A new label with updated resources or None if some resource
-               exceeds its limits.
-        """
+    def candidates_mask(self, from_label):
+        """Returns the bitmask of the customers that 'from_label' is going to
+           try to reach. Customers left out because of a resource that is not
+           monotone along the path shouldn't be added to the unreachable set,
+           so subclasses exclude them here rather than in 'new_label'."""
+
+        return (self.successors[from_label.customer.index]
+                & ~(from_label.unreachable_cs | 1 << from_label.customer.index))
+
+    def cut_off_mask(self, from_label):
+        """Returns the bitmask of the customers that no feasible arc (see
+           'arcs') reaches from the customer of 'from_label'. Since times
+           satisfy the triangle inequality and times and loads only grow
+           along a path, those customers can't be reached by any extension of
+           the label, so they are unreachable. The depot and the customer
+           itself have no arc from the customer, but are left out.
+           Rounding errors can break the triangle inequality by a few units
+           in the last place, so the arcs must be feasible within a
+           tolerance (see 'VRPTW.preprocess')."""
+
+        index = from_label.customer.index
+        successors = self.reach_masks[0][index]
+        return self.customers_mask & ~(successors | 1 << self.depot.index
+                                       | 1 << index)
+
+    def extended_resources(self, from_label):
+        """Returns the arrays of loads, times and costs of 'from_label'
+           extended to each customer, indexed by customer index. Resource
+           limits are not checked."""
 
-        load = from_label.load + to_cus.demand
-        if load > self.capacity:
-            return
-        
         from_cus = from_label.customer
-        time = max(from_label.time + from_cus.service_time
-                                   + self.times[from_cus, to_cus],
-                   to_cus.time_window[0])
-        if time > to_cus.time_window[1]:
-            return
+        loads = from_label.load + self.demands
+        times = np.maximum(from_label.time + from_cus.service_time
+                                           + self.times[from_cus],
+                           self.ready_times)
+        costs = (from_label.cost + self.costs[from_cus]
+                                 - self.duals[from_cus])
+        return loads, times, costs
+
+    def mask_to_array(self, mask):
+        """Returns a boolean array indexed by customer index that is True for
+           the customers in 'mask'."""
+
+        bits = np.frombuffer(mask.to_bytes(self.mask_bytes, 'little'),
+                             dtype=np.uint8)
+        return np.unpackbits(bits, count=self.n_customers,
+                             bitorder='little').view(bool)
+
+    @staticmethod
+    def array_to_mask(array):
+        """Inverse of 'mask_to_array'."""
+
+        return int.from_bytes(np.packbits(array, bitorder='little').tobytes(),
+                              'little')
+
+    def new_label(self, from_label, to_cus, cost, load, time):
+        """Returns the label that extends 'from_label' to 'to_cus' with the
+           given resources, already known to be within their limits, or None
+           if the extension is not allowed.
+           Subclasses that add resources should extend this method, which
+           'feasible_labels_from' calls for each feasible successor.
+        """
 
-        cost = (from_label.cost + self.costs[from_cus, to_cus]
-                                - self.duals[from_cus])
         # unreachable customers update is delayed since from_label needs to
         # visit every customer before knowing its own set
         return self.label_cls(to_cus, cost, load, time, from_label)
\ No newline at end of file
@@ -0,0 +1,115 @@
+import argparse as ap
+import numpy as np
+
+from Loader import distance_matrix
+from VRPTW import VRPTW
+
+# the kinds of customer locations and of time windows, see 'generate_data'
+KINDS = ('random', 'clustered', 'mixed')
+WINDOWS = ('tight', 'wide')
+# the scheduling horizons of the instances with tight and wide windows, and
+# the service time, of each kind of instance, like the ones of the Solomon
+# R, C and RC classes
+HORIZONS = {'random': (230, 1000), 'clustered': (1236, 3390),
+            'mixed': (240, 960)}
+SERVICE_TIMES = {'random': 10, 'clustered': 90, 'mixed': 10}
+# the half widths of the time windows, as fractions of the horizon
+HALF_WIDTHS = {'tight': (0.02, 0.09), 'wide': (0.03, 0.15)}
+SIDE = 100
+CAPACITY = 200
+MAX_DEMAND = 40
+
+def generate_data(n_customers, kind='random', windows='tight', seed=0):
+    """Generates an instance with 'n_customers' customers, in the style of
+       the Solomon instances: customers are on a 100 x 100 grid with the
+       depot at its center, either scattered uniformly ('random'), around a
+       few cluster centers ('clustered') or half and half ('mixed'). Time
+       windows are 'tight' (a short horizon and windows 10 to 40 wide) or
+       'wide' (a long horizon and windows 60 to 300 wide); each one is
+       centered on a time from which the customer can be served and the
+       vehicle can still go back to the depot, so that every customer can
+       be served by a route of its own.
+
+       The same arguments always give the same instance, all of whose
+       numbers are integers.
+
+       Returns:
+           The number of vehicles (one for each customer), the capacity and
+           the array of the customer lines, depot first, as returned by
+           'Loader.parse'.
+    """
+
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind of instance '{kind}'")
+    if windows not in WINDOWS:
+        raise ValueError(f"Unknown kind of time windows '{windows}'")
+    rng = np.random.default_rng(seed)
+    n_clustered = {'random': 0, 'clustered': n_customers,
+                   'mixed': n_customers // 2}[kind]
+    n_clusters = max(2, n_clustered // 10)
+    centers = rng.uniform(0.1 * SIDE, 0.9 * SIDE, (n_clusters, 2))
+    clustered = (centers[rng.integers(n_clusters, size=n_clustered)]
+                 + rng.normal(0, 0.05 * SIDE, (n_clustered, 2)))
+    scattered = rng.uniform(0, SIDE, (n_customers - n_clustered, 2))
+    coords = np.clip(np.rint(np.vstack((clustered, scattered))), 0, SIDE)
+    depot = np.array([SIDE // 2, SIDE // 2])
+    demands = rng.integers(1, MAX_DEMAND + 1, n_customers)
+
+    horizon = HORIZONS[kind][WINDOWS.index(windows)]
+    service = SERVICE_TIMES[kind]
+    # the time from the depot, and the latest time a customer can be left
+    # to go back to the depot in time
+    travel = np.ceil(np.linalg.norm(coords - depot, axis=1))
+    latest = horizon - travel - service
+    middles = np.floor(rng.uniform(travel, latest + 1))
+    low, high = HALF_WIDTHS[windows]
+    half_widths = np.rint(rng.uniform(low * horizon, high * horizon,
+                                      n_customers))
+    ready = np.maximum(0, middles - half_widths)
+    due = np.minimum(latest, middles + half_widths)
+
+    data = np.column_stack((np.arange(1, n_customers + 1), coords, demands,
+                            ready, due, np.full(n_customers, service)))
+    data = np.vstack(([0, *depot, 0, 0, horizon, 0], data)).astype(int)
+    return n_customers, CAPACITY, data
+
+def generate(n_customers, kind='random', windows='tight', seed=0,
+             distances='float64'):
+    """Returns a VRPTW instance generated by 'generate_data', with a
+       distance matrix of the type 'distances' (see
+       'Loader.distance_matrix')."""
+
+    vehicles, capacity, data = generate_data(n_customers, kind, windows, seed)
+    return VRPTW.from_data(vehicles, capacity, data,
+                           distance_matrix(data[:, 1:3], distances))
+
+def write(output_file, vehicles, capacity, data, name='GENERATED'):
+    """Writes an instance to the text file object 'output_file' in the
+       Solomon format."""
+
+    output_file.write(f"{name}\n\nVEHICLE\nNUMBER     CAPACITY\n"
+                      f"{vehicles:>5d}{capacity:>14d}\n\nCUSTOMER\n"
+                      "CUST NO.  XCOORD.   YCOORD.    DEMAND   READY TIME"
+                      "  DUE DATE   SERVICE   TIME\n\n")
+    for line in data:
+        output_file.write(''.join(f"{value:>10d}" for value in line) + '\n')
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description=('Generate a VRPTW instance in'
+                               ' the Solomon format.'))
+    parser.add_argument('output_file', type=str)
+    parser.add_argument('-n', '--customers', type=int, default=25,
+                        help='Number of customers')
+    parser.add_argument('--kind', choices=KINDS, default='random',
+                        help='Placement of the customers')
+    parser.add_argument('--windows', choices=WINDOWS, default='tight',
+                        help='Width of the time windows')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the random number generator')
+    args = parser.parse_args()
+
+    vehicles, capacity, data = generate_data(args.customers, args.kind,
+                                             args.windows, args.seed)
+    with open(args.output_file, 'w') as output_file:
+        write(output_file, vehicles, capacity, data,
+              f"{args.kind}-{args.windows}-{args.customers}-{args.seed}")
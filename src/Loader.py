@@ -0,0 +1,104 @@
+import hashlib
+import os
+import numpy as np
+import scipy.spatial.distance as sp
+
+# the types of distance matrices, see 'distance_matrix'
+DISTANCES = ('float64', 'float32', 'int')
+
+def parse(input_file):
+    """Reads an instance in the Solomon format, also used by the Gehring and
+       Homberger instances, from the text file object 'input_file', one line
+       at a time. The number of vehicles and the capacity are the numbers in
+       the first line after the VEHICLE header that has only numbers, and
+       the customers are the lines after the CUSTOMER header that have (at
+       least) seven numbers. Other lines, like the column headers, are
+       skipped, so the exact spacing of the file doesn't matter.
+
+       Returns:
+           The number of vehicles, the capacity and the array of the
+           customer lines: index, x and y coordinates, demand, ready time,
+           due date and service time. Its type is int if all of the numbers
+           are integers, float otherwise.
+    """
+
+    section = None
+    vehicles = capacity = None
+    rows = []
+    for line in input_file:
+        fields = line.split()
+        if not fields:
+            continue
+        keyword = fields[0].upper()
+        if keyword in ('VEHICLE', 'CUSTOMER'):
+            section = keyword
+            continue
+        try:
+            numbers = [float(field) for field in fields]
+        except ValueError:
+            # a column header
+            continue
+        if section == 'VEHICLE' and vehicles is None:
+            vehicles, capacity = numbers[:2]
+        elif section == 'CUSTOMER' and len(numbers) >= 7:
+            rows.append(numbers[:7])
+
+    if vehicles is None or not rows:
+        raise ValueError(f"{input_file.name}: not an instance in the Solomon"
+                         " format")
+    data = np.array(rows)
+    if np.array_equal(data, np.round(data)):
+        data = data.astype(int)
+    return int(vehicles), int(capacity), data
+
+def distance_matrix(coords, distances='float64'):
+    """Returns the square symmetric matrix of the euclidean distances between
+       the points in 'coords', as 'distances': 'float64', 'float32' (half
+       the memory, for large instances) or 'int', where distances are
+       rounded up, which keeps the triangle inequality that the ESPPRC
+       solvers rely on."""
+
+    if distances not in DISTANCES:
+        raise ValueError(f"Unknown distances type '{distances}'")
+    matrix = sp.squareform(sp.pdist(coords))
+    if distances == 'int':
+        return np.ceil(matrix).astype(np.int64)
+    return matrix.astype(distances, copy=False)
+
+def load(filename, cache_dir=None, distances='float64'):
+    """Reads the instance in the file 'filename' (see 'parse') and computes
+       its distance matrix (see 'distance_matrix').
+
+       If 'cache_dir' is given, both are saved there in a binary .npz file,
+       named after the hash of the content of the instance file and after
+       'distances', and read from it on the next calls, which skips parsing
+       and computing the distances. A changed file gets a new cache file.
+
+       Returns:
+           The number of vehicles, the capacity, the array of the customer
+           lines and the distance matrix.
+    """
+
+    if cache_dir is None:
+        with open(filename) as input_file:
+            vehicles, capacity, data = parse(input_file)
+        return vehicles, capacity, data, distance_matrix(data[:, 1:3],
+                                                         distances)
+
+    with open(filename, 'rb') as input_file:
+        digest = hashlib.sha1(input_file.read()).hexdigest()
+    cache_file = os.path.join(cache_dir, f"{digest}-{distances}.npz")
+    if os.path.exists(cache_file):
+        with np.load(cache_file) as cache:
+            return (int(cache['vehicles']), int(cache['capacity']),
+                    cache['data'], cache['costs'])
+
+    vehicles, capacity, data, costs = load(filename, None, distances)
+    os.makedirs(cache_dir, exist_ok=True)
+    # written to a temporary file first, so that concurrent runs never read
+    # a partial one
+    temp_file = f"{cache_file}.{os.getpid()}.npz"
+    np.savez(temp_file, vehicles=vehicles, capacity=capacity, data=data,
+             costs=costs)
+    os.replace(temp_file, cache_file)
+    return vehicles, capacity, data, costs
@@ -0,0 +1,324 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+try:
+    import gurobipy as gp
+except ImportError:
+    gp = None
+
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+class Master(ABC):
+    """The restricted master problem of the VRPTW column generation: a set
+       partitioning linear model with a column for each path.
+
+       Its rows are, in order: the minimum number of vehicles (>=), one row
+       for each customer that must be visited (= 1), indexed by customer
+       index, and the maximum number of vehicles (<=). Row 0 is the one of
+       the minimum number of vehicles, since the depot has index 0.
+       Columns are identified by the handles returned by 'add_column'.
+
+       This is the interface used by VRPTW, implemented by a class for each
+       LP solver. Columns added or removed are sent to the solver all at
+       once, when the model is optimized again.
+
+       Arguments:
+           n_customers: the number of customers, depot included
+           max_vehicles: maximum number of vehicles available
+    """
+
+    def __init__(self, n_customers, max_vehicles):
+        self.n_rows = n_customers + 1
+        self.rhs = np.ones(self.n_rows)
+        self.rhs[0] = 0
+        self.rhs[-1] = max_vehicles
+
+    def set_vehicles(self, min_vehicles, max_vehicles):
+        """Sets the bounds on the number of vehicles."""
+
+        self.rhs[0] = min_vehicles
+        self.rhs[-1] = max_vehicles
+
+    @abstractmethod
+    def add_column(self, cost, rows, coeffs):
+        """Adds a column with the given cost and the coefficients 'coeffs' on
+           the 'rows' (the others are zero). Returns its handle."""
+
+    @abstractmethod
+    def remove_columns(self, columns):
+        """Removes the columns of the list of handles 'columns'."""
+
+    @abstractmethod
+    def set_upper_bounds(self, columns, bounds):
+        """Sets the upper bounds of 'columns' (infinite by default) to the
+           ones in the list 'bounds'. A column is forbidden by setting its
+           upper bound to zero."""
+
+    @abstractmethod
+    def optimize(self):
+        """Optimizes the model, starting from the last solution if possible.
+           Returns True if an optimal solution was found, False if the model
+           is infeasible. Raises RuntimeError for any other outcome of the
+           solver, since no solution or duals can be trusted then."""
+
+    @abstractmethod
+    def objective(self):
+        """Returns the objective value of the last solution."""
+
+    @abstractmethod
+    def duals(self):
+        """Returns the array of the duals of the rows, in order."""
+
+    @abstractmethod
+    def values(self, columns):
+        """Returns the list of the values of 'columns' in the last
+           solution."""
+
+    @abstractmethod
+    def costs(self, columns):
+        """Returns the list of the costs of 'columns', as floats."""
+
+    @abstractmethod
+    def basic(self, columns):
+        """Returns a list of booleans telling whether each column of 'columns'
+           is basic in the last solution."""
+
+    @abstractmethod
+    def row_basis(self):
+        """Returns the list of the basis statuses of the rows in the last
+           solution, as integers that only 'set_basis' of the same class can
+           understand."""
+
+    @abstractmethod
+    def set_basis(self, basic, row_statuses):
+        """Makes the next optimization start from the basis where the
+           columns in 'basic' are basic, the other ones are at their lower
+           bound, and the rows have the given statuses (see 'row_basis').
+           The basis is ignored if it's not valid."""
+
+class GurobiMaster(Master):
+    """Master problem solved with Gurobi. Handles are the Gurobi variables
+       and the model is updated lazily by Gurobi itself."""
+
+    def __init__(self, n_customers, max_vehicles):
+        super().__init__(n_customers, max_vehicles)
+        model = gp.Model("VRPTW")
+        model.Params.OutputFlag = 0
+        model.ModelSense = gp.GRB.MINIMIZE
+        senses = ([gp.GRB.GREATER_EQUAL]
+                  + [gp.GRB.EQUAL] * (n_customers - 1)
+                  + [gp.GRB.LESS_EQUAL])
+        for sense, rhs in zip(senses, self.rhs.tolist()):
+            model.addLConstr(gp.LinExpr(), sense, rhs)
+        model.update()
+        self.model = model
+        self.constrs = model.getConstrs()
+
+    def set_vehicles(self, min_vehicles, max_vehicles):
+        super().set_vehicles(min_vehicles, max_vehicles)
+        self.constrs[0].RHS = min_vehicles
+        self.constrs[-1].RHS = max_vehicles
+
+    def add_column(self, cost, rows, coeffs):
+        column = gp.Column(coeffs, [self.constrs[row] for row in rows])
+        return self.model.addVar(obj=cost, column=column)
+
+    def remove_columns(self, columns):
+        for var in columns:
+            self.model.remove(var)
+
+    def set_upper_bounds(self, columns, bounds):
+        if columns:
+            self.model.setAttr('UB', columns, bounds)
+
+    def optimize(self):
+        self.model.optimize()
+        status = self.model.Status
+        if status == gp.GRB.OPTIMAL:
+            return True
+        if status in (gp.GRB.INFEASIBLE, gp.GRB.INF_OR_UNBD):
+            return False
+        raise RuntimeError(f"Gurobi stopped with status {status}")
+
+    def objective(self):
+        return self.model.ObjVal
+
+    def duals(self):
+        return np.array(self.model.getAttr('Pi', self.constrs))
+
+    def values(self, columns):
+        return self.model.getAttr('X', columns)
+
+    def costs(self, columns):
+        return self.model.getAttr('Obj', columns)
+
+    def basic(self, columns):
+        return [status == gp.GRB.BASIC
+                for status in self.model.getAttr('VBasis', columns)]
+
+    def row_basis(self):
+        return self.model.getAttr('CBasis', self.constrs)
+
+    def set_basis(self, basic, row_statuses):
+        self.model.update()
+        variables = self.model.getVars()
+        statuses = dict.fromkeys(variables, gp.GRB.NONBASIC_LOWER)
+        statuses.update(dict.fromkeys(basic, gp.GRB.BASIC))
+        self.model.setAttr('VBasis', variables, list(statuses.values()))
+        self.model.setAttr('CBasis', self.constrs, row_statuses)
+
+class HighsMaster(Master):
+    """Master problem solved with HiGHS. Handles are integers and the
+       position of each column in the HiGHS model is kept in 'positions'.
+       HiGHS keeps the basis of the last solution when columns are added
+       or removed, so the model is re-optimized from there."""
+
+    def __init__(self, n_customers, max_vehicles):
+        super().__init__(n_customers, max_vehicles)
+        highs = highspy.Highs()
+        highs.setOptionValue('output_flag', False)
+        lower = self.rhs.copy()
+        upper = self.rhs.copy()
+        upper[0] = highspy.kHighsInf
+        lower[-1] = -highspy.kHighsInf
+        highs.addRows(self.n_rows, lower, upper, 0,
+                      np.zeros(self.n_rows, dtype=np.int32),
+                      np.array([], dtype=np.int32), np.array([]))
+        self.highs = highs
+        self.positions = {}
+        self.column_costs = {}
+        # the upper bounds that are not infinite
+        self.upper_bounds = {}
+        self.new_columns = []
+        self.next_handle = 0
+
+    def set_vehicles(self, min_vehicles, max_vehicles):
+        super().set_vehicles(min_vehicles, max_vehicles)
+        self.highs.changeRowBounds(0, min_vehicles, highspy.kHighsInf)
+        self.highs.changeRowBounds(self.n_rows - 1, -highspy.kHighsInf,
+                                   max_vehicles)
+
+    def add_column(self, cost, rows, coeffs):
+        handle = self.next_handle
+        self.next_handle += 1
+        self.column_costs[handle] = float(cost)
+        self.new_columns.append((handle, rows, coeffs))
+        return handle
+
+    def remove_columns(self, columns):
+        removed = set(columns)
+        self.new_columns = [column for column in self.new_columns
+                            if column[0] not in removed]
+        positions = [self.positions.pop(handle) for handle in columns
+                     if handle in self.positions]
+        for handle in columns:
+            del self.column_costs[handle]
+            self.upper_bounds.pop(handle, None)
+        if positions:
+            self.highs.deleteCols(len(positions),
+                                  np.array(sorted(positions), dtype=np.int32))
+            # the remaining columns keep their order
+            order = sorted(self.positions, key=self.positions.get)
+            self.positions = {handle: position
+                              for position, handle in enumerate(order)}
+
+    def set_upper_bounds(self, columns, bounds):
+        positions, uppers = [], []
+        for handle, bound in zip(columns, bounds):
+            if bound == np.inf:
+                self.upper_bounds.pop(handle, None)
+            else:
+                self.upper_bounds[handle] = bound
+            # new columns get their bound when they are sent to HiGHS
+            if handle in self.positions:
+                positions.append(self.positions[handle])
+                uppers.append(bound)
+        if positions:
+            n = len(positions)
+            self.highs.changeColsBounds(n, np.array(positions, dtype=np.int32),
+                                        np.zeros(n), np.array(uppers,
+                                                              dtype=float))
+
+    def optimize(self):
+        if self.new_columns:
+            self.add_new_columns()
+        self.highs.run()
+        status = self.highs.getModelStatus()
+        if status in (highspy.HighsModelStatus.kInfeasible,
+                      highspy.HighsModelStatus.kUnboundedOrInfeasible):
+            return False
+        if status != highspy.HighsModelStatus.kOptimal:
+            raise RuntimeError("HiGHS stopped with status "
+                               + self.highs.modelStatusToString(status))
+        solution = self.highs.getSolution()
+        self.solution_duals = np.array(solution.row_dual)
+        self.solution_values = np.array(solution.col_value)
+        basis = self.highs.getBasis()
+        self.basis = basis.col_status
+        self.row_statuses = [int(status) for status in basis.row_status]
+        return True
+
+    def add_new_columns(self):
+        """Sends the columns added since the last optimization to HiGHS, in
+           a single call."""
+
+        first = len(self.positions)
+        starts, indices, values = [], [], []
+        for position, (handle, rows, coeffs) in enumerate(self.new_columns,
+                                                          first):
+            self.positions[handle] = position
+            starts.append(len(indices))
+            indices.extend(rows)
+            values.extend(coeffs)
+        n = len(self.new_columns)
+        costs = [self.column_costs[column[0]] for column in self.new_columns]
+        uppers = [self.upper_bounds.get(column[0], highspy.kHighsInf)
+                  for column in self.new_columns]
+        self.highs.addCols(n, np.array(costs, dtype=float), np.zeros(n),
+                           np.array(uppers, dtype=float), len(indices),
+                           np.array(starts, dtype=np.int32),
+                           np.array(indices, dtype=np.int32),
+                           np.array(values, dtype=float))
+        self.new_columns = []
+
+    def objective(self):
+        return self.highs.getInfo().objective_function_value
+
+    def duals(self):
+        return self.solution_duals
+
+    def values(self, columns):
+        return self.solution_values[[self.positions[handle]
+                                     for handle in columns]].tolist()
+
+    def costs(self, columns):
+        return [self.column_costs[handle] for handle in columns]
+
+    def basic(self, columns):
+        return [self.basis[self.positions[handle]]
+                == highspy.HighsBasisStatus.kBasic
+                for handle in columns]
+
+    def row_basis(self):
+        return self.row_statuses
+
+    def set_basis(self, basic, row_statuses):
+        if self.new_columns:
+            self.add_new_columns()
+        statuses = [highspy.HighsBasisStatus.kLower] * len(self.positions)
+        for handle in basic:
+            statuses[self.positions[handle]] = highspy.HighsBasisStatus.kBasic
+        basis = highspy.HighsBasis()
+        basis.col_status = statuses
+        basis.row_status = [highspy.HighsBasisStatus(status)
+                            for status in row_statuses]
+        basis.valid = True
+        # an invalid basis is rejected and the current one is kept
+        self.highs.setBasis(basis)
+
+# the master problem classes, by the name of their LP solver
+BACKENDS = {'gurobi': GurobiMaster, 'highs': HighsMaster}
@@ -0,0 +1,129 @@
+import numpy as np
+
+from ESPPRC import Label, ESPPRC
+from DSSR_ESPPRC import find_repeated
+
+def cycles(path):
+    """Arguments:
+           path: the sequence of customers to be searched for cycles.
+       Returns:
+           A generator of pairs, one for each cycle of 'path': the repeated
+           customer and the list of customers visited between its two
+           consecutive occurrences."""
+
+    last_seen = {}
+    for position, customer in enumerate(path):
+        if customer in last_seen:
+            yield customer, path[last_seen[customer] + 1:position]
+        last_seen[customer] = position
+
+class NG_Label(Label):
+    """ng-route relaxed version of ESP Label. Instead of all the visited
+       customers, the label only remembers the visited customers that are
+       in the neighbourhood of each customer visited after them (its ng
+       memory) and forbids to visit them again. So only cycles that stay
+       within the neighbourhoods are forbidden: the labels compared by the
+       dominance relation carry much smaller sets than the ESP ones, while
+       the returned paths cost close to the elementary ones.
+       The ng memory is stored as a bitmask."""
+
+    __slots__ = ('ng_memory',)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.ng_memory = 0
+
+    def dominates(self, label):
+        return (super().dominates(label)
+                and not self.ng_memory & ~label.ng_memory)
+
+class NG_SPPRC(ESPPRC):
+    """ng-route relaxation SPPRC algorithm. See NG label for details.
+
+       The neighbourhood of each customer is made of the 'ng_size' customers
+       nearest to it (according to the costs), itself included.
+       Returned paths may contain cycles (that leave some neighbourhood), in
+       which case the master problem counts every visit of a customer.
+       If 'grow' is True, neighbourhoods are enlarged DSSR-style instead: when
+       all negative paths found are cyclic, the repeated customer of each
+       cycle is added to the neighbourhoods of the customers visited along
+       the cycle, so that the same cycle is forbidden, and the algorithm is
+       restarted until an elementary path with negative cost is found (or
+       no negative path remains). Neighbourhoods are kept between calls.
+       The cheapest path of the last relaxation then bounds the reduced cost
+       of the elementary ones (see 'min_reduced_cost').
+    """
+
+    def __init__(self, *args, ng_size=8, grow=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.label_cls = NG_Label
+        self.ng_size = ng_size
+        self.grow = grow
+        self.neighbourhoods = self.nearest_neighbourhoods(ng_size)
+        # the cost of the cheapest path of the last relaxation
+        self.relaxed_min = 0
+
+    def nearest_neighbourhoods(self, size):
+        """Returns a list of bitmasks, indexed by customer index, of the
+           'size' nearest customers to each customer. The depot doesn't
+           belong to any neighbourhood."""
+
+        neighbourhoods = [0] * self.n_customers
+        for customer in self.customers:
+            if customer is self.depot:
+                continue
+            nearest = [index
+                       for index in np.argsort(self.costs[customer]).tolist()
+                       if index not in (self.depot.index, customer.index)]
+            mask = 1 << customer.index
+            for index in nearest[:size - 1]:
+                mask |= 1 << index
+            neighbourhoods[customer.index] = mask
+        return neighbourhoods
+
+    def solve(self):
+        self.prepare()
+        while True:
+            labels = self.extend_labels()
+            self.relaxed_min = labels[0].cost if labels else 0
+            if not self.grow:
+                return labels
+
+            elementary, cyclic = [], []
+            for label in labels:
+                if find_repeated(label.path[1:-1]):
+                    if label.cost < -1e-9:
+                        cyclic.append(label)
+                else:
+                    elementary.append(label)
+            if not cyclic:
+                return labels
+            if elementary and elementary[0].cost < -1e-9:
+                return elementary
+
+            if self.label_stats is not None:
+                self.label_stats['restarts'] += 1
+            for label in cyclic:
+                for customer, inner in cycles(label.path[1:-1]):
+                    for inner_cus in inner:
+                        self.neighbourhoods[inner_cus.index] |= (
+                            1 << customer.index)
+
+    def min_reduced_cost(self, labels):
+        # elementary paths can be returned while cheaper cyclic ones exist
+        return self.relaxed_min
+
+    def candidates_mask(self, from_label):
+        # customers in the ng memory are not unreachable for good, since
+        # they can leave the memory later along the path
+        return super().candidates_mask(from_label) & ~from_label.ng_memory
+
+    def new_label(self, from_label, to_cus, *args):
+        label = super().new_label(from_label, to_cus, *args)
+        if not label:
+            return
+
+        label.ng_memory = ((from_label.ng_memory
+                            & self.neighbourhoods[to_cus.index])
+                           | 1 << to_cus.index)
+        return label
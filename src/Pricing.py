@@ -0,0 +1,59 @@
+from time import perf_counter
+
+from ESPPRC import ESPPRC
+from DSSR_ESPPRC import DSSR_ESPPRC
+from BD_ESPPRC import BD_ESPPRC
+from NG_SPPRC import NG_SPPRC
+
+# the pricing solvers, by the name used on the command line (SSR_SPPRC is
+# left out, since it's there only for testing)
+SOLVERS = {'exact': ESPPRC, 'dssr': DSSR_ESPPRC, 'bidir': BD_ESPPRC,
+           'ng': NG_SPPRC}
+
+class PricingCascade:
+    """A sequence of pricing stages, each one being an ESPPRC solver, that
+       share the same dual variables array.
+
+       Stages are run in order and the first one that finds paths with
+       negative reduced cost wins, so cheap heuristics can be put before the
+       exact solver, which is then run only when all of them fail. The last
+       stage should be exact, since it's the one that proves that there is
+       no path with negative reduced cost.
+
+       Attributes:
+           stages: a list of (name, solver) pairs
+           duals: the dual variables array, shared by all the solvers
+           last_stage: the name of the stage that produced the last result
+           stats: a dictionary with the statistics of each stage: number of
+                  calls, number of columns produced (updated by the caller)
+                  and time spent
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+        self.duals = stages[-1][1].duals
+        for name, solver in stages:
+            solver.duals = self.duals
+        self.last_stage = None
+        self.stats = {name: {'calls': 0, 'columns': 0, 'time': 0}
+                      for name, solver in stages}
+
+    def solve(self, is_new=None):
+        """Returns the labels found by the first stage that finds some with
+           negative cost, or the ones of the last stage. If given, 'is_new'
+           tells whether the path of a label is not a column of the master
+           problem yet: a stage whose negative labels are all columns
+           already (because of rounding errors) gives nothing to add, so the
+           next stage is run instead."""
+
+        for name, solver in self.stages:
+            start = perf_counter()
+            labels = solver.solve()
+            stats = self.stats[name]
+            stats['calls'] += 1
+            stats['time'] += perf_counter() - start
+            if any(label.cost < -1e-9 and (is_new is None or is_new(label))
+                   for label in labels):
+                break
+        self.last_stage = name
+        return labels
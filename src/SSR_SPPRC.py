@@ -7,6 +7,8 @@ class SSR_Label(Label):
        grow in number and less paths are explored reducing the execution time,
        but it is possible to have cycles in the path found."""
 
+    __slots__ = ('n_visited',)
+
     def __init__(self, *args):
         super().__init__(*args)
         self.n_visited = 0
@@ -17,18 +19,15 @@ class SSR_Label(Label):
 class SSR_SPPRC(ESPPRC):
     """State space relaxation SPPRC algorithm. See SSR label for details."""
 
-    def __init__(self, *args):
-        super().__init__(*args)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.label_cls = SSR_Label
 
-    def extended_label(self, from_label, to_cus):
-        label = super().extended_label(from_label, to_cus)
-        if not label:
-            return
-            
+    def new_label(self, from_label, *args):
         n_visited = from_label.n_visited + 1
         if n_visited > self.n_customers:
             return
         
+        label = super().new_label(from_label, *args)
         label.n_visited = n_visited
         return label
\ No newline at end of file
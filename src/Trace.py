@@ -0,0 +1,33 @@
+import json
+from time import perf_counter
+
+class Tracer:
+    """A trace of the events of a solver, written to the text file object
+       'output' as JSON lines: one object for each event, with its name in
+       'event', the seconds since the tracer was created in 'at', and the
+       fields of the event.
+
+       Solvers keep a tracer in their 'tracer' attribute, None when tracing
+       is disabled, and check it before building an event, so that tracing
+       costs nothing when it's off.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.start = perf_counter()
+
+    def event(self, name, **fields):
+        """Writes the event 'name' with the given fields, which must be
+           serializable to JSON, or numpy scalars."""
+
+        record = {'event': name, 'at': round(perf_counter() - self.start, 6)}
+        record.update(fields)
+        self.output.write(json.dumps(record, default=scalar) + '\n')
+
+def scalar(value):
+    """Returns the Python number of a numpy scalar, which the json module
+       can't serialize."""
+
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
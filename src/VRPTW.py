@@ -1,10 +1,13 @@
 import numpy as np
 import scipy.spatial.distance as sp
-import gurobipy as gp
-from functools import lru_cache
+from time import perf_counter, time
 
-from BB import BBNode, BB
+from BB import BBNode, BB, parallel_BB
+from Construction import initial_routes, is_feasible, route_cost
 from ESPPRC import ESPPRC
+from Loader import load
+from Master import GurobiMaster
+from Pricing import PricingCascade
 
 class Customer:
     """A customer is a node of the graph. It has an index, a location and
@@ -58,26 +61,84 @@ class VRPTW:
        the euclidean distance between the two. Also time from i to j is equal to
        distance.
 
+       Before solving, the time windows of the customers are tightened and
+       the arcs that no feasible path can use are found (see 'preprocess'),
+       so that the ESPPRC solvers never try them.
+
+       The dual variables of the master problem oscillate a lot from one
+       iteration to the next, so they can optionally be stabilized with
+       Wentges smoothing: the ESPPRC is given a convex combination of the
+       current duals and of the ones that gave the best Lagrangian bound so
+       far (the stability center), with weight 'smoothing' on the center.
+       When none of the paths found has a negative reduced cost for the
+       current duals (a mis-pricing) the ESPPRC is run again on them.
+
+       Every exact pricing gives a Lagrangian lower bound on the master
+       problem (see 'lagrangian_bound'), so column generation can also be
+       stopped early: when the relative gap between the master objective and
+       the best bound is at most 'max_gap', after 'max_iterations' pricing
+       iterations, after 'time_limit' seconds, at the 'deadline' (a time as
+       returned by time.time(), used by branch and bound to stop all of
+       its nodes at the same time), or when the bound reaches 'cutoff'
+       (used by branch and bound to prune nodes). All of them are disabled
+       by default.
+
+       When the paths found so far can't satisfy the fleet size or the
+       branching decisions, the master problem gets an artificial column
+       for each row, with a cost higher than the one of any solution (see
+       'init_model'), which makes its LP feasible (a Phase I). The problem
+       is infeasible only if some artificial column is still used when
+       column generation has converged.
+
+       Columns that stay out of the basis for more than 'max_age'
+       consecutive iterations are moved from the master problem to a pool
+       (if 'max_age' is set), which keeps the LP small. Before each pricing
+       the pool columns are priced with the current duals, and the ones
+       with negative reduced cost go back to the master problem instead of
+       running the ESPPRC.
+
+       If 'tracer' is set to a Trace.Tracer, the master problem solves, the
+       pricing iterations, with the label counters of the ESPPRC solvers
+       (see ESPPRC), and the branch and bound nodes are written to its
+       trace.
+
        Arguments:
            vehicles: number of vehicles available
            capacity: maximum capacity of each vehicle
            customers: a list of Customer objects
+           costs: the matrix of the distances between customers, computed
+                  from their coordinates if not given
     """
 
     @staticmethod
-    def from_file(filename):
-        """Create a VRPTW instance from a text file."""
+    def from_file(filename, cache_dir=None, distances='float64'):
+        """Create a VRPTW instance from a text file in the Solomon format.
+
+           Arguments:
+               filename: the path of the file
+               cache_dir: if given, the directory where the parsed instance
+                          and its distance matrix are cached (see
+                          'Loader.load')
+               distances: the type of the distance matrix, 'float64',
+                          'float32' or 'int' (see 'Loader.distance_matrix')
+        """
 
-        with open(filename) as input_file:
-            lines = input_file.readlines()
-            vehicles, capacity = [int(i) for i in lines[4].split()]
-            data = [[int(i) for i in line.split()] for line in lines[9:]]
+        vehicles, capacity, data, costs = load(filename, cache_dir, distances)
+        return VRPTW.from_data(vehicles, capacity, data, costs)
 
-        customers = [Customer(line[0], np.array(line[1:3]), line[3], line[4:6],
-                              line[6])
-                     for line in data if line]
-        vrptw = VRPTW(vehicles, capacity, customers)
-        return vrptw
+    @staticmethod
+    def from_data(vehicles, capacity, data, costs=None):
+        """Create a VRPTW instance from the array 'data' of the customer
+           lines of an instance in the Solomon format: index, x and y
+           coordinates, demand, ready time, due date and service time (see
+           'Loader.parse'). The costs are the euclidean distances if not
+           given.
+        """
+
+        customers = [Customer(int(line[0]), np.array(line[1:3]), line[3],
+                              line[4:6], line[6])
+                     for line in np.asarray(data).tolist()]
+        return VRPTW(vehicles, capacity, customers, costs)
 
     @staticmethod
     def compute_costs(customers):
@@ -86,54 +147,578 @@ class VRPTW:
         coords = [customer.coords for customer in customers]
         return sp.squareform(sp.pdist(coords))
 
-    def __init__(self, vehicles, capacity, customers):
-        self.vehicles = len(customers) - 1
+    def __init__(self, vehicles, capacity, customers, costs=None):
+        self.vehicles = vehicles
         self.capacity = capacity
         self.customers = customers
-        self.costs = self.compute_costs(customers)
+        if costs is None:
+            costs = self.compute_costs(customers)
+        self.costs = costs
         self.times = self.costs
+        self.smoothing = 0
+        self.max_gap = None
+        self.max_iterations = None
+        self.time_limit = None
+        self.deadline = None
+        self.cutoff = np.inf
+        self.max_age = None
+        self.tracer = None
+        self.preprocess()
+
+    def preprocess(self, tolerance=1e-6):
+        """Tightens the time windows of the customers with the Desrochers et
+           al. rules, until no window changes: service at a customer can't
+           start before the earliest arrival from any predecessor, and
+           there is no need to start it before the earliest start at any
+           successor allows; it can't start after the latest start at any
+           successor allows, and no predecessor can reach it after the
+           latest arrival from them. Then finds the feasible arcs: the ones
+           that can be travelled without violating the time window or the
+           capacity. The original windows are kept in 'raw_windows', the
+           boolean matrix of the feasible arcs in 'arcs' and the number of
+           tightened windows and pruned arcs in 'preprocessing_stats'.
 
-    def init_model(self):
-        """Inits the master problem model."""
+           Windows are tightened a little less ('tolerance') than the rules
+           allow, and arcs are infeasible only when they miss the window by
+           more than that, so that rounding errors never make a feasible path
+           infeasible. The tolerance grows with the rounding error of the
+           times, e.g. for float32 distances, since with them a path through
+           another customer can arrive earlier than the direct arc (see
+           'ESPPRC.cut_off_mask').
+
+           The customers given to the constructor may be shared with other
+           instances, so the ones with a tightened window are replaced by
+           copies in 'customers'.
+        """
+
+        customers = self.customers = list(self.customers)
+        self.raw_windows = [list(customer.time_window)
+                            for customer in customers]
+        ready = np.array([customer.time_window[0] for customer in customers],
+                         dtype=float)
+        due = np.array([customer.time_window[1] for customer in customers],
+                       dtype=float)
+        services = np.array([customer.service_time
+                             for customer in customers])
+        demands = np.array([customer.demand for customer in customers])
+        durations = services[:, None] + self.times
+        fits = demands[:, None] + demands <= self.capacity
+        fits[0] = fits[:, 0] = True
+        np.fill_diagonal(fits, False)
+        # floating point times are off by a few units in the last place of
+        # the latest time (integer ones are exact)
+        if self.times.dtype.kind == 'f':
+            precision = np.finfo(self.times.dtype).eps
+            tolerance = max(tolerance, 8 * precision * np.abs(due).max())
+
+        while True:
+            arcs = fits & (ready[:, None] + durations <= due + tolerance)
+            earliest_arrival = np.where(arcs, ready[:, None] + durations,
+                                        np.inf).min(axis=0)
+            earliest_start = np.where(arcs, ready - durations,
+                                      np.inf).min(axis=1)
+            latest_arrival = np.where(arcs, due[:, None] + durations,
+                                      -np.inf).max(axis=0)
+            latest_start = np.where(arcs, due - durations,
+                                    -np.inf).max(axis=1)
+            new_ready = np.maximum(ready, np.maximum(
+                np.minimum(due, earliest_arrival),
+                np.minimum(due, earliest_start)) - tolerance)
+            new_due = np.minimum(due, np.minimum(
+                np.maximum(ready, latest_arrival),
+                np.maximum(ready, latest_start)) + tolerance)
+            # the depot is both the start and the end of each path, so its
+            # window can't be tightened by these rules
+            new_ready[0], new_due[0] = ready[0], due[0]
+            if (np.allclose(new_ready, ready, rtol=0, atol=tolerance)
+                and np.allclose(new_due, due, rtol=0, atol=tolerance)):
+                break
+            ready, due = new_ready, new_due
+
+        tightened = 0
+        for i, (customer, window) in enumerate(zip(customers,
+                                                   self.raw_windows)):
+            new_window = [float(ready[customer.index]),
+                          float(due[customer.index])]
+            if new_window != window:
+                customers[i] = Customer(customer.index, customer.coords,
+                                        customer.demand, new_window,
+                                        customer.service_time)
+                tightened += 1
+        self.arcs = arcs
+        n_arcs = len(customers) * (len(customers) - 1)
+        self.preprocessing_stats = {'windows': tightened, 'arcs': n_arcs,
+                                    'pruned arcs': n_arcs - int(arcs.sum())}
+
+    def init_model(self, master_cls=GurobiMaster, construct=True):
+        """Inits the master problem model.
+
+           Its initial columns are the routes that visit a single customer
+           and, if 'construct' is True, the routes of a solution found by a
+           constructive heuristic (see Construction), which give column
+           generation a much better starting point. Neither needs to respect
+           the fleet size: the first time the master problem is infeasible,
+           an artificial column for each row, whose cost 'penalty' is higher
+           than the one of all the single customer routes together, is added
+           to keep it feasible until column generation finds paths that can
+           replace them (see 'infeasibility'). They are not added as long as
+           they are not needed, since even out of the basis they change the
+           duals the LP solver picks on the degenerate master problems, which
+           makes column generation slower.
+
+           Arguments:
+               master_cls: the class of the master problem, which decides the
+                           LP solver used (see Master)
+               construct: whether to add the routes of the heuristic
+        """
 
-        # TODO: the first set of paths must be feasible, now it's only a guess
         path_costs = self.costs[0, 1:]*2
-        self.paths = [(0, customer.index, 0) for customer in self.customers[1:]]
-        self.paths_set = set(self.paths)
-        n = len(self.paths)
-        A = np.eye(n)
-        b = np.ones(n)
-        model = gp.Model("VRPTW")
-        model.Params.OutputFlag = 0
-        x = model.addMVar(n, name="v", vtype=gp.GRB.CONTINUOUS)
-        model.setObjective(path_costs @ x, gp.GRB.MINIMIZE)
-        self.min_vehicles_constr = model.addConstr(sum(x) >= 0)[0]
-        model.addMConstrs(A, x, '=', b)
-        self.max_vehicles_constr = model.addConstr(sum(x) <= self.vehicles)[0]
-        self.model = model
-
-    def set_espprc_solver(self, espprc_cls):
-        self.espprc = espprc_cls(self.capacity, self.customers, self.costs,
-                                 self.times)
+        paths = [(0, customer.index, 0) for customer in self.customers[1:]]
+        self.path_stages = dict.fromkeys(paths, 'initial')
+        routes = initial_routes(self) if construct else []
+        self.master_cls = master_cls
+        self.master = master_cls(len(self.customers), self.vehicles)
+        self.penalty = (sum(path_costs.tolist()) + 1) * len(self.customers)
+        self.artificials = []
+        # the paths in the master problem and their columns, the number of
+        # consecutive iterations they have been non-basic, and the costs of
+        # the paths moved to the pool
+        self.paths = {}
+        self.ages = {}
+        self.pool = {}
+        # the arcs allowed by the branching decisions and the paths in the
+        # master problem that use the others, whose columns are fixed to 0
+        self.allowed_arcs = np.ones_like(self.arcs)
+        self.fixed = set()
+        for path, cost in zip(paths, path_costs.tolist()):
+            self.add_column(path, cost)
+        for route in routes:
+            path = tuple(route)
+            if path not in self.paths:
+                self.add_column(path, route_cost(self, route))
+                self.path_stages[path] = 'construction'
+        self.stats = {'iterations': 0, 'mispricings': 0, 'pricing time': 0,
+                      'lp time': 0, 'lp solves': 0, 'purged': 0,
+                      'restored': 0}
+        # best lower bound after each column generation iteration
+        self.bounds = []
+
+    def __getstate__(self):
+        """The master problem and the pricing solvers can't be pickled, so
+           a pickled VRPTW keeps the costs of its columns instead, and
+           rebuilds them when it is unpickled (see '__setstate__')."""
+
+        state = self.__dict__.copy()
+        for name in ('master', 'espprc', 'pricing', 'artificials'):
+            state.pop(name, None)
+        # the trace file stays with the process that opened it
+        state['tracer'] = None
+        if 'master' in self.__dict__:
+            columns = list(self.paths.values())
+            state['paths'] = dict(zip(self.paths,
+                                      self.master.costs(columns)))
+            state['phase_one'] = bool(self.artificials)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'master_cls' in state:
+            ages = self.ages
+            self.master = self.master_cls(len(self.customers), self.vehicles)
+            self.artificials = []
+            if state['phase_one']:
+                self.add_artificial_columns()
+            self.paths = {}
+            self.fixed = set()
+            for path, cost in state['paths'].items():
+                self.add_column(path, cost)
+            self.ages = ages
+        if 'pricing_args' in state:
+            espprc_cls, heuristics, kwargs = self.pricing_args
+            self.set_espprc_solver(espprc_cls, heuristics, **kwargs)
+            self.set_arc_branches(())
+
+    def add_artificial_columns(self):
+        """Adds to the master problem an artificial column for each row,
+           with cost 'penalty', that can satisfy the row on its own: it
+           covers a customer, or adds a vehicle to the minimum number, or
+           removes one from the maximum number. Their handles are kept in
+           'artificials', by row, which is empty until they are added."""
+
+        last = len(self.customers)
+        self.artificials = [
+            self.master.add_column(self.penalty, [row],
+                                   [-1 if row == last else 1])
+            for row in range(last + 1)]
+
+    def infeasibility(self):
+        """Returns the total value of the artificial columns in the last
+           solution of the master problem, which is zero (up to a tolerance)
+           when the solution uses only paths."""
+
+        return sum(self.master.values(self.artificials))
+
+    def set_espprc_solver(self, espprc_cls, heuristics=None, **kwargs):
+        """Sets the ESPPRC solver class. Keyword arguments are passed to its
+           constructor.
+           
+           Arguments:
+               espprc_cls: the ESPPRC solver class
+               heuristics: an optional dictionary of heuristic pricing stages
+                           to run, in order, before the solver (see
+                           PricingCascade). Each stage is a solver of the same
+                           class, built with the options given as its value
+                           (like 'max_labels' or 'max_arcs').
+        """
+
+        self.pricing_args = (espprc_cls, heuristics, kwargs)
+
+        def solver(**options):
+            return espprc_cls(self.capacity, self.customers, self.costs,
+                              self.times, arcs=self.arcs, **kwargs, **options)
+
+        self.espprc = solver()
+        stages = [(name, solver(**options))
+                  for name, options in (heuristics or {}).items()]
+        stages.append(('exact', self.espprc))
+        self.pricing = PricingCascade(stages)
+
+    def set_arc_branches(self, branches):
+        """Enforces the arc branching decisions 'branches', a sequence of
+           (i, j, flow) triples: the arc from customer i to customer j must
+           have the given flow, 0 or 1, in the solution. Flow 0 forbids the
+           arc, flow 1 forbids the other arcs leaving i and entering j.
+
+           The ESPPRC solvers only get the feasible arcs left, and the master
+           problem columns of the paths that use the forbidden ones are
+           fixed to 0 (the single customer routes that use infeasible arcs
+           are kept, as without branching). The
+           route made of each chain of arcs with flow 1 is added, so that
+           the master problem can stay feasible even if the single customer
+           routes of its customers are fixed.
+        """
+
+        allowed = np.ones_like(self.arcs)
+        successors = {}
+        for i, j, flow in branches:
+            if flow:
+                allowed[i, :] = False
+                allowed[:, j] = False
+                allowed[i, j] = True
+                successors[i] = j
+            else:
+                allowed[i, j] = False
+        self.allowed_arcs = allowed
+        for name, solver in self.pricing.stages:
+            solver.set_arcs(self.arcs & allowed)
+
+        for head in set(successors).difference(successors.values()):
+            route = [0, head]
+            while route[-1] in successors:
+                route.append(successors[route[-1]])
+            route.append(0)
+            path = tuple(route)
+            if path not in self.paths and is_feasible(self, route):
+                self.pool.pop(path, None)
+                self.add_column(path, route_cost(self, route))
+                self.path_stages[path] = 'branching'
+
+        fixed = {path for path in self.paths if self.is_forbidden(path)}
+        changed = [path for path in fixed.symmetric_difference(self.fixed)
+                   if path in self.paths]
+        self.master.set_upper_bounds([self.paths[path] for path in changed],
+                                     [0 if path in fixed else np.inf
+                                      for path in changed])
+        self.fixed = fixed
+
+    def is_forbidden(self, path):
+        """Returns True if 'path' uses an arc that is not allowed by the
+           branching decisions."""
+
+        path = list(path)
+        return not self.allowed_arcs[path[:-1], path[1:]].all()
+
+    def warm_start(self, basis):
+        """Makes the next optimization start from 'basis', a triple with the
+           list of the basic paths, the list of the rows whose artificial
+           column is basic (added if needed) and the list of the row
+           statuses of a previous solution (see 'Master.set_basis'). The
+           basic paths that have been moved to the pool are put back in the
+           master problem, fixed to 0 if the branching decisions forbid them.
+        """
+
+        basic, artificials, row_statuses = basis
+        restored = [path for path in basic if path not in self.paths]
+        if any(path not in self.pool for path in restored):
+            return
+        for path in restored:
+            self.add_column(path, self.pool.pop(path))
+        fixed = [path for path in restored if self.is_forbidden(path)]
+        self.master.set_upper_bounds([self.paths[path] for path in fixed],
+                                     [0] * len(fixed))
+        self.fixed.update(fixed)
+        if artificials and not self.artificials:
+            self.add_artificial_columns()
+        self.master.set_basis([self.paths[path] for path in basic]
+                              + [self.artificials[row] for row in artificials],
+                              row_statuses)
+
+    def basis(self):
+        """Returns the basis of the last solution, as used by 'warm_start'."""
+
+        columns = list(self.paths.values())
+        basic = [path for path, is_basic
+                 in zip(self.paths, self.master.basic(columns)) if is_basic]
+        artificials = [row for row, is_basic in
+                       enumerate(self.master.basic(self.artificials))
+                       if is_basic]
+        return basic, artificials, self.master.row_basis()
+
+    def arc_flows(self, solution):
+        """Returns a dictionary with the flow on each arc used by
+           'solution', a list of (path, cost, value) triples like the one
+           returned by 'used_paths'."""
+
+        flows = {}
+        for path, cost, value in solution:
+            for arc in zip(path, path[1:]):
+                flows[arc] = flows.get(arc, 0) + value
+        return flows
 
     def solve(self):
-        self.model.optimize()
-        if self.model.status == gp.GRB.INFEASIBLE:
+        """Solves the master problem by column generation.
+
+           Returns:
+               None if the master problem is infeasible, otherwise a tuple
+               with the objective, the paths used (see 'used_paths') and the
+               best lower bound found. The objective is optimal, and equal
+               to the bound, unless column generation stopped early. If it
+               stopped before the artificial columns left the solution, there
+               is no solution yet: the objective is infinite and no path is
+               used. When it stops early, the paths found by the last pricing
+               are moved to the pool, so that solving again goes on from
+               them.
+        """
+
+        start = perf_counter()
+        if not self.optimize():
             return
 
+        center = None
+        center_bound = -np.inf
+        iterations = 0
         while True:
-            duals = [constr.Pi for constr in self.model.getConstrs()]
-            self.espprc.duals[:] = duals[:-1]
-            self.espprc.duals[0] += duals[-1]
-            labels = self.espprc.solve()
-            if labels and labels[0].cost >= -1e-9:
-                return (self.model.getObjective().getValue(), self.used_paths())
-            for label in labels:
-                if label.cost >= 0:
+            duals = self.master.duals()
+            restored = self.priced_pool(duals)
+            if restored:
+                # columns are aged only on pricing iterations, otherwise on
+                # degenerate LPs the same columns could keep going back and
+                # forth from the pool
+                for path in restored:
+                    self.add_column(path, self.pool.pop(path))
+                self.stats['restored'] += len(restored)
+                self.optimize()
+                continue
+
+            if center is None or not self.smoothing:
+                smoothed = duals
+            else:
+                smoothed = (self.smoothing * center
+                            + (1 - self.smoothing) * duals)
+            while True:
+                labels = self.price(smoothed)
+                bound = self.lagrangian_bound(smoothed, labels)
+                if bound is not None and bound > center_bound:
+                    center, center_bound = smoothed, bound
+                columns = self.negative_paths(labels, duals)
+                if columns or smoothed is duals:
                     break
-                path = [customer.index for customer in label.path]
-                self.add_path(path, label.cost)
-            self.model.optimize()
+                # mis-pricing: the smoothed duals are not good enough to find
+                # the paths that price out at the current ones
+                self.stats['mispricings'] += 1
+                smoothed = duals
+
+            obj = self.master.objective()
+            phase_one = self.infeasibility() > 1e-6
+            if not columns:
+                if phase_one:
+                    # no path can replace the artificial columns
+                    return
+                # no path prices out, so the master objective is optimal
+                self.bounds.append(obj)
+                return obj, self.used_paths(), obj
+            if phase_one:
+                obj = np.inf
+            self.bounds.append(center_bound)
+            iterations += 1
+            stage = self.pricing.last_stage
+            if self.stop(obj, center_bound, iterations,
+                         perf_counter() - start):
+                # the paths found go to the pool, so that solving again,
+                # like branch and bound does, goes on from them
+                for path, cost in columns:
+                    path = tuple(path)
+                    self.pool[path] = cost + sum(
+                        self.espprc.duals[list(path[:-1])])
+                    self.path_stages[path] = stage
+                return (obj, [] if phase_one else self.used_paths(),
+                        center_bound)
+            self.age_columns()
+            for path, cost in columns:
+                if self.add_path(path, cost):
+                    self.path_stages[tuple(path)] = stage
+                    self.pricing.stats[stage]['columns'] += 1
+            self.optimize()
+
+    def stop(self, obj, bound, iterations, elapsed):
+        """Returns True if column generation must stop before the master
+           problem is solved to optimality (see the limits in the class
+           documentation)."""
+
+        # there is no gap while the objective is infinite (see 'solve')
+        gap = (obj - bound) / max(abs(obj), 1e-9) if obj < np.inf else np.inf
+        return (bound >= self.cutoff
+                or self.max_gap is not None and gap <= self.max_gap
+                or self.max_iterations is not None
+                   and iterations >= self.max_iterations
+                or self.time_limit is not None and elapsed >= self.time_limit
+                or self.deadline is not None and time() >= self.deadline)
+
+    def optimize(self):
+        """Optimizes the master problem, keeping track of the time spent,
+           and adds the artificial columns the first time it's infeasible.
+           Returns False if it's infeasible even with them."""
+
+        start = perf_counter()
+        feasible = self.master.optimize()
+        if not feasible and not self.artificials:
+            self.add_artificial_columns()
+            feasible = self.master.optimize()
+        elapsed = perf_counter() - start
+        self.stats['lp time'] += elapsed
+        self.stats['lp solves'] += 1
+        if self.tracer:
+            self.tracer.event('lp', solve=self.stats['lp solves'],
+                              iteration=self.stats['iterations'],
+                              time=elapsed, columns=len(self.paths),
+                              objective=(self.master.objective() if feasible
+                                         else None))
+        return feasible
+
+    def price(self, duals):
+        """Solves the pricing problem for the given master problem duals.
+
+           Arguments:
+               duals: the array of the duals of the master problem
+                      constraints, in order
+           Returns:
+               The labels returned by the pricing solvers.
+        """
+
+        self.espprc.duals[:] = self.espprc_duals(duals)
+        if self.tracer:
+            for name, solver in self.pricing.stages:
+                solver.reset_label_stats()
+        start = perf_counter()
+        labels = self.pricing.solve(
+            lambda label: tuple(customer.index for customer in label.path)
+                          not in self.paths)
+        elapsed = perf_counter() - start
+        self.stats['pricing time'] += elapsed
+        self.stats['iterations'] += 1
+        if self.tracer:
+            # the stages run, up to the last one
+            names = [name for name, solver in self.pricing.stages]
+            stages = self.pricing.stages[:names.index(
+                self.pricing.last_stage) + 1]
+            self.tracer.event('pricing', iteration=self.stats['iterations'],
+                              time=elapsed, stage=self.pricing.last_stage,
+                              labels=len(labels),
+                              stages={name: solver.label_stats
+                                      for name, solver in stages})
+        return labels
+
+    @staticmethod
+    def espprc_duals(duals):
+        """Returns the duals as used by the ESPPRC, indexed by customer index,
+           from the ones of the master problem constraints."""
+
+        esp_duals = duals[:-1].copy()
+        # both vehicles constraints are paid when leaving the depot
+        esp_duals[0] += duals[-1]
+        return esp_duals
+
+    def priced_pool(self, duals):
+        """Returns the list of the paths in the pool whose reduced cost is
+           negative for the master problem 'duals'."""
+
+        esp_duals = self.espprc_duals(duals)
+        return [path for path, cost in self.pool.items()
+                if cost - esp_duals[list(path[:-1])].sum() < -1e-9
+                   and not self.is_forbidden(path)]
+
+    def age_columns(self):
+        """Updates the number of consecutive iterations each column has been
+           non-basic in the last master problem solution, and moves the
+           columns older than 'max_age' to the pool. The initial columns are
+           never moved, so that the master problem stays feasible."""
+
+        if self.max_age is None:
+            return
+
+        paths = list(self.paths)
+        columns = list(self.paths.values())
+        basic = self.master.basic(columns)
+        costs = self.master.costs(columns)
+        purged = []
+        for path, column, is_basic, cost in zip(paths, columns, basic, costs):
+            self.ages[path] = 0 if is_basic else self.ages[path] + 1
+            if (self.ages[path] > self.max_age
+                and self.path_stages[path] != 'initial'):
+                self.pool[path] = cost
+                purged.append(column)
+                del self.paths[path]
+                del self.ages[path]
+        self.master.remove_columns(purged)
+        self.stats['purged'] += len(purged)
+
+    def lagrangian_bound(self, duals, labels):
+        """Returns the Lagrangian lower bound on the master problem given by
+           'duals' and the 'labels' that the pricing found for them: the dual
+           objective plus the maximum number of vehicles times the lowest
+           reduced cost (see 'ESPPRC.min_reduced_cost'), when negative.
+           Returns None if the labels are not exact, i.e. they don't come
+           from the last pricing stage.
+        """
+
+        if self.pricing.last_stage != self.pricing.stages[-1][0]:
+            return
+        rhs = self.master.rhs
+        min_cost = self.espprc.min_reduced_cost(labels)
+        return rhs @ duals + rhs[-1] * min(0, min_cost)
+
+    def negative_paths(self, labels, duals):
+        """Returns a list of (path, reduced cost) pairs for the paths of
+           'labels' whose reduced cost is negative for 'duals', which may not
+           be the ones they were priced with. The reduced cost is the one
+           given by the pricing duals, as needed by 'add_path'. Paths already
+           in the master problem are left out: their reduced cost can only be
+           negative because of rounding errors, and adding nothing would
+           make column generation loop forever."""
+
+        pricing_duals = self.espprc.duals
+        esp_duals = self.espprc_duals(duals)
+        paths = []
+        for label in labels:
+            path = [customer.index for customer in label.path]
+            visits = path[:-1]
+            if tuple(path) in self.paths:
+                continue
+            reduced_cost = (label.cost + sum(pricing_duals[visits])
+                            - sum(esp_duals[visits]))
+            if reduced_cost < -1e-9:
+                paths.append((path, label.cost))
+        return paths
     
     def add_path(self, path, reduced_cost):
         """Add path to the master problem.
@@ -141,63 +726,226 @@ class VRPTW:
            Arguments:
                path: the path to be added
                reduced_cost: the path reduced cost
+           Returns:
+               True if the path was added, False if it was already there.
         """
 
         path_t = tuple(path)
-        if path_t in self.paths_set:
-            return
+        if path_t in self.paths:
+            return False
             
-        self.paths.append(path_t)
-        self.paths_set.add(path_t)
-        n_customers = len(self.customers)
-        path[-1] = n_customers
-        coeffs = np.zeros(n_customers + 1)
-        coeffs[path] = 1
         cost = reduced_cost + sum(self.espprc.duals[path[:-1]])
-        self.model.addVar(obj=cost, name=f"v{len(self.paths)-1}",
-                          column=gp.Column(coeffs, self.model.getConstrs()))
+        self.pool.pop(path_t, None)
+        self.add_column(path_t, cost)
+        return True
+
+    def add_column(self, path, cost):
+        """Adds the column of 'path', with the given cost, to the master
+           problem. The columns added before the next optimization are sent
+           to the solver all at once."""
+
+        rows = list(path)
+        rows[-1] = len(self.customers)
+        # relaxed solvers can return paths that visit a customer more than
+        # once: the customer constraint coefficient is the number of visits
+        rows, visits = np.unique(rows, return_counts=True)
+        self.paths[path] = self.master.add_column(cost, rows.tolist(),
+                                                  visits.tolist())
+        self.ages[path] = 0
+        # new columns are not fixed
+        self.fixed.discard(path)
 
     def used_paths(self):
         """Returns the path used in the optimal solution."""
         
-        return [(path, var.Obj, var.x)
-                for path, var in zip(self.paths, self.model.getVars())
-                if var.x != 0]
+        columns = list(self.paths.values())
+        costs = self.master.costs(columns)
+        values = self.master.values(columns)
+        return [(path, cost, value)
+                for path, cost, value in zip(self.paths, costs, values)
+                if value != 0]
+
+    def bb_solve(self, processes=1, strategy='best', time_limit=None):
+        """Solves the problem with a branch and price: nodes are split on
+           the number of vehicles when it's fractional, then on the flow of
+           an arc between two customers (see 'VRPTW_BBNode'). With more than
+           one process the nodes are solved in parallel, by worker processes
+           that have their own copy of this VRPTW, master problem and pricing
+           solvers included (see 'parallel_BB'). The columns found by a
+           worker are shared with the others, through the nodes solved next.
+           The statistics are then the ones of the root node only.
+
+           The search, column generation of the nodes included, stops after
+           'time_limit' seconds. The lower bound of the search is kept in
+           'bb_bound': it is the objective of the best integer node, unless
+           the search stopped before it was complete, or column generation
+           stopped early (see the limits in the class documentation) on a
+           node whose solution was integer (see 'BB').
 
-    def bb_solve(self):
+           Arguments:
+               processes: the number of processes that solve nodes
+               strategy: the order in which open nodes are explored, 'best'
+                         first or 'depth' first (see 'OpenNodes')
+               time_limit: the maximum time of the search, in seconds
+           Returns:
+               The best integer node, or None if there is none.
+        """
+
+        if time_limit is not None:
+            self.deadline = time() + time_limit
         root = VRPTW_BBNode(self, 0, self.vehicles)
-        return BB(root)
+        try:
+            if processes > 1:
+                best, self.bb_bound = parallel_BB(root, processes, init_worker,
+                                                  (self,), strategy,
+                                                  time_limit)
+            else:
+                best, self.bb_bound = BB(root, strategy, time_limit)
+        finally:
+            self.deadline = None
+        return best
+
+# the VRPTW of a worker process of the parallel branch and bound
+worker_vrptw = None
+
+def init_worker(vrptw):
+    global worker_vrptw
+    worker_vrptw = vrptw
 
 def is_integer(value):
-    return np.isclose(value, np.round(value), atol=1e-6) 
+    return bool(np.isclose(value, np.round(value), atol=1e-6))
 
 class VRPTW_BBNode(BBNode):
-    def __init__(self, vrptw, min_vehicles, max_vehicles):
+    """A node of the branch and price. It is defined by the bounds on the
+       number of vehicles and by the arc branching decisions (see
+       'VRPTW.set_arc_branches'). Its solution is integer when both the
+       number of vehicles and the flows on the arcs between customers are.
+       It's split on the number of vehicles if fractional, otherwise on the
+       most fractional arc flow, into a child where the arc is forbidden and
+       one where it must be used.
+
+       A node whose column generation stopped while the artificial columns
+       were still used (see 'VRPTW.solve') has no solution, so it's never
+       integer: it's split the same way, on the values of its path columns,
+       or, if they are integer, replaced by a copy of itself, whose column
+       generation goes on from the columns found so far.
+
+       Its columns are all the ones found by the column generation of the
+       nodes solved before it in the same process, and its master problem
+       starts from the optimal basis of its parent. When pickled to another
+       process, it is solved with the VRPTW of that process' worker (see
+       'init_worker'), and it shares the columns it adds.
+    """
+
+    def __init__(self, vrptw, min_vehicles, max_vehicles, arc_branches=(),
+                 basis=None):
         self.vrptw = vrptw
         self.min_vehicles = min_vehicles
         self.max_vehicles = max_vehicles
+        self.arc_branches = arc_branches
+        # the basis of the parent
+        self.basis = basis
         self.infeasible = False
+        self.pruned = False
+        # whether column generation stopped before finding a solution
+        self.no_solution = False
     
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['vrptw']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.vrptw = worker_vrptw
+
     def is_infeasible(self):
         return self.infeasible
+
+    def is_pruned(self):
+        return self.pruned
     
-    @lru_cache(maxsize=1)
     def is_integer(self):
-        return is_integer(self.current_vehicles())
+        return (not self.no_solution and is_integer(self.vehicles)
+                and self.branching_arc is None)
 
     def current_vehicles(self):
-        return sum(var.x for var in self.vrptw.model.getVars())
+        columns = list(self.vrptw.paths.values())
+        return sum(self.vrptw.master.values(columns))
     
+    def receive(self, shared):
+        vrptw = self.vrptw
+        for path, cost in shared:
+            if path not in vrptw.paths and path not in vrptw.pool:
+                vrptw.add_column(path, cost)
+                vrptw.path_stages[path] = 'shared'
+
     def split(self):
-        vehicles = self.current_vehicles()
-        return (VRPTW_BBNode(self.vrptw, self.min_vehicles, np.floor(vehicles)),
-                VRPTW_BBNode(self.vrptw, np.ceil(vehicles), self.max_vehicles))
-    
-    def solve(self):
-        self.vrptw.min_vehicles_constr.RHS = self.min_vehicles
-        self.vrptw.max_vehicles_constr.RHS = self.max_vehicles
-        results = self.vrptw.solve()
+        vehicles = self.vehicles
+        branches = self.arc_branches
+        if not is_integer(vehicles):
+            return (VRPTW_BBNode(self.vrptw, self.min_vehicles,
+                                 np.floor(vehicles), branches, self.basis),
+                    VRPTW_BBNode(self.vrptw, np.ceil(vehicles),
+                                 self.max_vehicles, branches, self.basis))
+        if self.branching_arc is None:
+            # no solution yet, and nothing to branch on
+            return (VRPTW_BBNode(self.vrptw, self.min_vehicles,
+                                 self.max_vehicles, branches, self.basis),)
+        i, j = self.branching_arc
+        return tuple(VRPTW_BBNode(self.vrptw, self.min_vehicles,
+                                  self.max_vehicles,
+                                  branches + ((i, j, flow),), self.basis)
+                     for flow in (0, 1))
+
+    def find_branching_arc(self, paths):
+        """Returns the arc between two customers whose flow in 'paths' (see
+           'VRPTW.used_paths') is the farthest from an integer, or None if
+           all of them are integer."""
+
+        flows = self.vrptw.arc_flows(paths)
+        fractions = {arc: abs(flow - np.round(flow))
+                     for arc, flow in flows.items() if 0 not in arc}
+        arc = max(fractions, key=fractions.get, default=None)
+        if arc is None or fractions[arc] <= 1e-6:
+            return
+        return arc
+
+    def solve(self, cutoff):
+        vrptw = self.vrptw
+        start = perf_counter()
+        known = set(vrptw.paths).union(vrptw.pool)
+        vrptw.set_arc_branches(self.arc_branches)
+        if self.basis:
+            vrptw.warm_start(self.basis)
+        vrptw.master.set_vehicles(self.min_vehicles, self.max_vehicles)
+        # column generation stops as soon as the node can't beat 'cutoff'
+        vrptw.cutoff = cutoff
+        results = vrptw.solve()
+        vrptw.cutoff = np.inf
+        added = [path for path in vrptw.paths if path not in known]
+        self.shared = list(zip(added, vrptw.master.costs(
+            [vrptw.paths[path] for path in added])))
+        self.shared.extend((path, cost) for path, cost in vrptw.pool.items()
+                           if path not in known)
         if results:
-            self.obj, self.solution = results
+            self.obj, self.solution, self.bound = results
+            self.pruned = bool(self.bound >= cutoff)
+            self.no_solution = self.obj == np.inf
+            self.vehicles = self.current_vehicles()
+            self.branching_arc = self.find_branching_arc(
+                vrptw.used_paths() if self.no_solution else self.solution)
+            self.basis = vrptw.basis()
         else:
-            self.infeasible = True
\ No newline at end of file
+            self.infeasible = True
+        if vrptw.tracer:
+            vrptw.tracer.event(
+                'node', min_vehicles=float(self.min_vehicles),
+                max_vehicles=float(self.max_vehicles),
+                arc_branches=[list(branch) for branch in self.arc_branches],
+                infeasible=self.infeasible, pruned=self.pruned,
+                solution=not self.infeasible and not self.no_solution,
+                objective=getattr(self, 'obj', None),
+                bound=getattr(self, 'bound', None),
+                integer=not self.infeasible and self.is_integer(),
+                time=perf_counter() - start)
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""The command line arguments shared by the scripts, added to an
+   argparse parser."""
+
+from Master import BACKENDS
+from Pricing import SOLVERS
+
+def add_solver(parser, default='dssr', help='Specify ESPPRC solver',
+               choices=SOLVERS):
+    parser.add_argument('-s', dest='solver', choices=choices, default=default,
+                        help=help)
+
+def add_lp(parser, default='gurobi',
+           help='Specify the LP solver of the master problem', **kwargs):
+    parser.add_argument('--lp', choices=BACKENDS, default=default, help=help,
+                        **kwargs)
+
+def add_gap(parser):
+    parser.add_argument('--gap', type=float, help=('Stop column generation'
+                        ' when the relative gap from the Lagrangian bound is'
+                        ' at most GAP'))
+
+def add_max_age(parser):
+    parser.add_argument('--max-age', type=int, help=('Move the columns'
+                        ' non-basic for more than this many iterations to'
+                        ' the column pool'))
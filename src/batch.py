@@ -0,0 +1,215 @@
+import argparse as ap
+import csv
+import glob
+import json
+import multiprocessing as mp
+import os
+from multiprocessing.connection import wait
+from time import perf_counter
+
+import numpy as np
+
+from VRPTW import VRPTW
+from Loader import DISTANCES
+from Master import BACKENDS
+from Pricing import SOLVERS
+import arguments
+# the fields of the results, in the order of the CSV columns
+FIELDS = ('instance', 'status', 'objective', 'bound', 'vehicles', 'routes',
+          'iterations', 'pricing time', 'lp time', 'lp solves', 'time',
+          'error')
+
+def instance_files(inputs):
+    """Returns the sorted list of the instance files given by 'inputs': a
+       list of files, directories (all of the .txt files inside them) or
+       glob patterns."""
+
+    files = set()
+    for path in inputs:
+        if os.path.isdir(path):
+            files.update(os.path.join(path, name) for name in os.listdir(path)
+                         if name.lower().endswith('.txt'))
+        elif os.path.exists(path):
+            files.add(path)
+        else:
+            files.update(glob.glob(path))
+    return sorted(files)
+
+def solve_instance(input_file, options):
+    """Solves the instance in 'input_file' with the given 'options' (the
+       ones of the command line) and returns its result, a dictionary with
+       the FIELDS (except 'instance').
+
+       The status is 'optimal' or 'infeasible', or 'stopped' if column
+       generation, or the branch and price, stopped early because of the
+       time limit or the gap, so that the objective is not optimal (or
+       missing, if no solution was found) and 'bound' is a lower bound.
+       With branch and price the time limit is the one of the whole search.
+    """
+
+    start = perf_counter()
+    vrptw = VRPTW.from_file(input_file, options['cache'], options['distances'])
+    vrptw.time_limit = options['time_limit']
+    vrptw.max_gap = options['gap']
+    vrptw.init_model(BACKENDS[options['lp']])
+    vrptw.set_espprc_solver(SOLVERS[options['solver']])
+    if options['bb']:
+        results = vrptw.bb_solve(strategy=options['strategy'],
+                                 time_limit=options['time_limit'])
+    else:
+        results = vrptw.solve()
+
+    stats = vrptw.stats
+    result = {'status': 'infeasible', 'objective': None, 'bound': None,
+              'vehicles': None, 'routes': [],
+              'iterations': stats['iterations'],
+              'pricing time': stats['pricing time'],
+              'lp time': stats['lp time'], 'lp solves': stats['lp solves']}
+    if options['bb'] and vrptw.bb_bound < np.inf:
+        # the bound of the search, not the one of the best node
+        result.update(status='stopped', bound=vrptw.bb_bound)
+    if results:
+        obj, paths, bound = results
+        if options['bb']:
+            bound = vrptw.bb_bound
+        result.update(status='optimal' if bound >= obj - 1e-6 else 'stopped',
+                      # no solution was found if column generation stopped
+                      # in phase one (see 'VRPTW.solve')
+                      objective=obj if obj < np.inf else None, bound=bound,
+                      vehicles=sum(value for path, cost, value in paths),
+                      routes=[[list(path), value]
+                              for path, cost, value in paths])
+    result['time'] = perf_counter() - start
+    return result
+
+def worker(connection, input_file, options):
+    """Runs 'solve_instance' in a child process and sends the result, or the
+       error, back through 'connection'."""
+
+    try:
+        result = solve_instance(input_file, options)
+    except Exception as error:
+        result = {'status': 'error', 'error': repr(error)}
+    connection.send(result)
+    connection.close()
+
+class Results:
+    """The results file, in the JSON lines or CSV 'format', to which results
+       are appended as soon as they are available, so that an interrupted
+       run can be resumed: the instances already there are not solved
+       again."""
+
+    def __init__(self, filename, format):
+        self.filename = filename
+        self.format = format
+        self.done = set()
+        if os.path.exists(filename):
+            with open(filename, newline='') as results_file:
+                if format == 'csv':
+                    records = csv.DictReader(results_file)
+                else:
+                    records = (json.loads(line) for line in results_file
+                               if line.strip())
+                self.done = {record['instance'] for record in records}
+
+    def write(self, record):
+        new = not os.path.exists(self.filename)
+        with open(self.filename, 'a', newline='') as results_file:
+            if self.format == 'csv':
+                writer = csv.DictWriter(results_file, FIELDS,
+                                        extrasaction='ignore')
+                if new:
+                    writer.writeheader()
+                if 'routes' in record:
+                    record = dict(record, routes=json.dumps(record['routes']))
+                writer.writerow(record)
+            else:
+                results_file.write(json.dumps(record) + '\n')
+        self.done.add(record['instance'])
+
+def run(files, options, results, processes, time_limit=None):
+    """Solves the instances in 'files' that are not in 'results' yet, at
+       most 'processes' at a time, each one in its own process. Column
+       generation stops after 'time_limit' seconds, and a process that is
+       still running some seconds later (10% of the limit, at least 5) is
+       killed and its instance gets the 'timeout' status."""
+
+    # solvers like Gurobi can't be used in a forked process
+    context = mp.get_context('spawn')
+    pending = [input_file for input_file in files
+               if input_file not in results.done]
+    running = {}
+    while pending or running:
+        while pending and len(running) < processes:
+            input_file = pending.pop(0)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=worker,
+                                      args=(sender, input_file, options))
+            process.start()
+            sender.close()
+            running[receiver] = (input_file, process, perf_counter())
+
+        for receiver in wait(list(running), timeout=1):
+            input_file, process, start = running.pop(receiver)
+            try:
+                result = receiver.recv()
+            except EOFError:
+                # the process died without sending a result
+                result = {'status': 'error',
+                          'error': f"exit code {process.exitcode}"}
+            process.join()
+            results.write(dict(instance=input_file, **result))
+            print(f"{input_file}: {result['status']}", flush=True)
+
+        if time_limit is None:
+            continue
+        for receiver, (input_file, process, start) in list(running.items()):
+            if perf_counter() - start > time_limit + max(5, time_limit / 10):
+                process.kill()
+                process.join()
+                del running[receiver]
+                results.write({'instance': input_file, 'status': 'timeout',
+                               'time': perf_counter() - start})
+                print(f"{input_file}: timeout", flush=True)
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description=('Solve many VRPTW instances in'
+                               ' parallel and write their results to a file.'))
+    parser.add_argument('inputs', nargs='+', help=('Instance files,'
+                        ' directories or glob patterns'))
+    parser.add_argument('-o', '--output', default='results.jsonl',
+                        help=('Results file, extended if it already exists'
+                              ' (the instances in it are skipped)'))
+    parser.add_argument('--format', choices=('jsonl', 'csv'), help=('Format'
+                        ' of the results file, from its extension by'
+                        ' default'))
+    arguments.add_solver(parser)
+    arguments.add_lp(parser)
+    parser.add_argument('--bb', action='store_true', help=('Apply a branch'
+                        ' and price scheme on number of vehicles and arc'
+                        ' flows'))
+    parser.add_argument('--strategy', choices=('best', 'depth'),
+                        default='best', help=('Explore the branch and bound'
+                        ' nodes best first or depth first'))
+    parser.add_argument('--time-limit', type=float, help=('Time limit of'
+                        ' each instance, in seconds'))
+    arguments.add_gap(parser)
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='Number of instances solved at the same time')
+    parser.add_argument('--cache', metavar='DIR', help=('Cache the parsed'
+                        ' instances and their distances in DIR'))
+    parser.add_argument('--distances', choices=DISTANCES, default='float64',
+                        help='Type of the distance matrix')
+    args = parser.parse_args()
+
+    format = args.format or ('csv' if args.output.endswith('.csv')
+                             else 'jsonl')
+    options = {'solver': args.solver, 'lp': args.lp, 'bb': args.bb,
+               'strategy': args.strategy, 'time_limit': args.time_limit,
+               'gap': args.gap, 'cache': args.cache,
+               'distances': args.distances}
+    files = instance_files(args.inputs)
+    results = Results(args.output, format)
+    print(f"{len(files)} instances,"
+          f" {len(results.done.intersection(files))} already solved")
+    run(files, options, results, args.processes, args.time_limit)
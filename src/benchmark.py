@@ -0,0 +1,42 @@
+import argparse as ap
+
+from VRPTW import VRPTW
+from Master import BACKENDS
+from DSSR_ESPPRC import DSSR_ESPPRC
+import arguments
+
+def lp_stats(input_file, master_cls, max_age=None):
+    """Solves the column generation of the instance in 'input_file' with
+       the given master problem class and returns its objective and the
+       number of LP solves and the time spent in them."""
+
+    vrptw = VRPTW.from_file(input_file)
+    vrptw.max_age = max_age
+    vrptw.init_model(master_cls)
+    vrptw.set_espprc_solver(DSSR_ESPPRC)
+    obj, paths, bound = vrptw.solve()
+    return obj, vrptw.stats['lp solves'], vrptw.stats['lp time']
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description=('Compare the LP time per column'
+                               ' generation iteration of the master problem'
+                               ' backends.'))
+    parser.add_argument('input_files', type=str, nargs='+')
+    arguments.add_lp(parser, default=list(BACKENDS), nargs='+',
+                     help='LP solvers to compare')
+    arguments.add_max_age(parser)
+    args = parser.parse_args()
+
+    print(f"{'instance':<20} {'lp':<8} {'objective':>12} {'solves':>7}"
+          f" {'lp time':>9} {'per solve':>10}")
+    for input_file in args.input_files:
+        for lp in args.lp:
+            try:
+                obj, solves, time = lp_stats(input_file, BACKENDS[lp],
+                                             args.max_age)
+            except Exception as error:
+                # e.g. a missing solver or license
+                print(f"{input_file:<20} {lp:<8} failed: {error}")
+                continue
+            print(f"{input_file:<20} {lp:<8} {obj:>12.4f} {solves:>7}"
+                  f" {time:>8.3f}s {1000 * time / solves:>8.2f}ms")
@@ -3,41 +3,137 @@ from timeit import timeit
 import argparse as ap
 
 from VRPTW import Customer, VRPTW
-from ESPPRC import ESPPRC
+from Loader import DISTANCES
+from Trace import Tracer
+from Master import BACKENDS, GurobiMaster
+from Pricing import SOLVERS
 from DSSR_ESPPRC import DSSR_ESPPRC
 from SSR_SPPRC import SSR_SPPRC
+from NG_SPPRC import NG_SPPRC
+import arguments
 
 results = []
+vrptw = None
 
-def test(input_file, espprc_cls, bb):
-    global results
-    vrptw = VRPTW.from_file(input_file)
-    vrptw.init_model()
-    vrptw.set_espprc_solver(espprc_cls)
+def test(input_file, espprc_cls, espprc_args, bb, smoothing=0, limits=None,
+         master_cls=GurobiMaster, construct=True, processes=1,
+         strategy='best', cache_dir=None, distances='float64', tracer=None):
+    global results, vrptw
+    vrptw = VRPTW.from_file(input_file, cache_dir, distances)
+    vrptw.tracer = tracer
+    vrptw.smoothing = smoothing
+    for limit, value in (limits or {}).items():
+        setattr(vrptw, limit, value)
+    vrptw.init_model(master_cls, construct)
+    vrptw.set_espprc_solver(espprc_cls, **espprc_args)
     if bb:
-        results = vrptw.bb_solve()
+        results = vrptw.bb_solve(processes, strategy)
     else:
         results = vrptw.solve()
 
 if __name__ == "__main__":
     parser = ap.ArgumentParser(description='Solve VRPTW problem.')
     parser.add_argument('input_file', type=str)
-    choices = ('exact', 'ssr', 'dssr')
-    solvers = (ESPPRC, SSR_SPPRC, DSSR_ESPPRC)
-    choice_to_solvers = dict(zip(choices, solvers))
-    parser.add_argument('-s', dest='espprc_solver', choices=choices,
-                        default='exact', help='Specify ESPPRC solver')
+    solvers = dict(SOLVERS, ssr=SSR_SPPRC)
+    arguments.add_solver(parser, default='exact', choices=solvers)
+    arguments.add_lp(parser)
+    parser.add_argument('--cache', metavar='DIR', help=('Cache the parsed'
+                        ' instance and its distances in DIR'))
+    parser.add_argument('--distances', choices=DISTANCES, default='float64',
+                        help='Type of the distance matrix')
+    parser.add_argument('--trace', metavar='FILE', help=('Write a trace of'
+                        ' the solver events to FILE, as JSON lines'))
+    parser.add_argument('--ng-size', type=int, default=8, help=('Size of the'
+                        ' neighbourhoods of the ng solver'))
+    parser.add_argument('--ng-grow', action='store_true', help=('Grow the'
+                        ' neighbourhoods of the ng solver DSSR-style'))
+    parser.add_argument('--critical-rule', choices=('all', 'most'),
+                        default='all', help=('Customers of the cycles made'
+                        ' critical by the dssr solver at each restart'))
+    parser.add_argument('--max-critical-age', type=int, help=('Drop the'
+                        ' critical customers of the dssr solver that forbade'
+                        ' no cycle for more than this many pricings'))
+    parser.add_argument('--cascade', action='store_true', help=('Try'
+                        ' heuristic pricing (truncated labeling, then'
+                        ' labeling on the cheapest arcs) before the solver'))
+    parser.add_argument('--max-labels', type=int, default=2, help=('Labels'
+                        ' kept on each customer by truncated labeling'))
+    parser.add_argument('--max-arcs', type=int, default=5, help=('Arcs kept'
+                        ' out of each customer by reduced arcs labeling'))
+    parser.add_argument('--smoothing', type=float, default=0, help=('Weight'
+                        ' of the stability center in the Wentges smoothing'
+                        ' of the duals (0 disables it)'))
+    arguments.add_gap(parser)
+    parser.add_argument('--max-iterations', type=int, help=('Stop column'
+                        ' generation after this many pricing iterations'))
+    parser.add_argument('--time-limit', type=float, help=('Stop column'
+                        ' generation after this many seconds'))
+    arguments.add_max_age(parser)
+    parser.add_argument('--no-construction', action='store_true', help=(
+                        'Start from single customer routes only, without'
+                        ' the routes of the constructive heuristic'))
     parser.add_argument('--bb', action='store_true', help=('Apply a branch and'
-                        'bound scheme on number of vehicles'))
+                        ' price scheme on number of vehicles and arc flows'))
+    parser.add_argument('--strategy', choices=('best', 'depth'),
+                        default='best', help=('Explore the branch and bound'
+                        ' nodes best first or depth first'))
+    parser.add_argument('--processes', type=int, default=1, help=('Solve'
+                        ' the branch and bound nodes in parallel with this'
+                        ' many worker processes'))
     args = parser.parse_args()
     
-    espprc_cls = choice_to_solvers[args.espprc_solver]
-    print(timeit("test(args.input_file, espprc_cls, args.bb)", number=1,
-                 globals=globals()))
+    espprc_cls = solvers[args.solver]
+    espprc_args = {}
+    if espprc_cls is NG_SPPRC:
+        espprc_args = {'ng_size': args.ng_size, 'grow': args.ng_grow}
+    elif espprc_cls is DSSR_ESPPRC:
+        espprc_args = {'critical_rule': args.critical_rule,
+                       'max_critical_age': args.max_critical_age}
+    if args.cascade:
+        espprc_args['heuristics'] = {
+            'truncated': {'max_labels': args.max_labels},
+            'reduced arcs': {'max_arcs': args.max_arcs}}
+    limits = {'max_gap': args.gap, 'max_iterations': args.max_iterations,
+              'time_limit': args.time_limit, 'max_age': args.max_age}
+    master_cls = BACKENDS[args.lp]
+    trace_file = open(args.trace, 'w') if args.trace else None
+    tracer = Tracer(trace_file) if trace_file else None
+    print(timeit("test(args.input_file, espprc_cls, espprc_args, args.bb,"
+                 " args.smoothing, limits, master_cls,"
+                 " not args.no_construction, args.processes,"
+                 " args.strategy, args.cache, args.distances, tracer)",
+                 number=1, globals=globals()))
+    if trace_file:
+        trace_file.close()
     if results:
-        obj, paths = results
-        print(obj)
+        obj, paths, bound = results
+        if args.bb:
+            # the bound of the search, not the one of the best node
+            bound = vrptw.bb_bound
+        if obj == np.inf:
+            print(f"stopped before finding a solution, lower bound: {bound}")
+        else:
+            print(obj)
+            if bound < obj:
+                print(f"stopped early, lower bound: {bound}")
         for path in paths:
             print(path)
+    elif args.bb and vrptw.bb_bound < np.inf:
+        print("stopped before finding a solution, lower bound:"
+              f" {vrptw.bb_bound}")
     else:
-        print("Problem is infeasible.")
\ No newline at end of file
+        print("Problem is infeasible.")
+    stats = vrptw.preprocessing_stats
+    print(f"preprocessing: {stats['windows']} time windows tightened,"
+          f" {stats['pruned arcs']} of {stats['arcs']} arcs pruned")
+    stats = vrptw.stats
+    print(f"column generation: {stats['iterations']} pricing iterations"
+          f" ({stats['mispricings']} mis-pricings),"
+          f" {stats['pricing time']:.3f}s pricing, {stats['lp time']:.3f}s LP")
+    if args.max_age is not None:
+        print(f"column pool: {stats['purged']} columns purged,"
+              f" {stats['restored']} restored, {len(vrptw.pool)} left")
+    if args.cascade:
+        for stage, stats in vrptw.pricing.stats.items():
+            print(f"{stage}: {stats['calls']} calls, {stats['columns']}"
+                  f" columns, {stats['time']:.3f}s")
\ No newline at end of file
@@ -0,0 +1,148 @@
+import argparse as ap
+import io
+import json
+import os
+import socketserver
+import sys
+
+from Dynamic import DynamicVRPTW
+from Master import BACKENDS
+from Pricing import SOLVERS
+import arguments
+
+class Service:
+    """Answers the requests of the re-optimization service, JSON objects
+       whose 'op' is one of:
+           load: loads the instance in 'file', or the one with the given
+                 'vehicles', 'capacity' and 'customers' (the customer lines,
+                 depot first)
+           add: adds the customer line 'customer' (id, x and y coordinates,
+                demand, ready time, due date and service time), or replaces
+                the customer with the same id
+           remove: removes the customer 'id'
+           window: sets the 'ready' time and the 'due' date of customer 'id'
+           demand: sets the 'demand' of customer 'id'
+           vehicles: sets the number of 'vehicles'
+           solve: re-optimizes (with branch and price if 'bb' is true) and
+                  answers with the routes (see 'solve')
+       Every answer has 'ok', false with the 'error' if the request failed.
+       The problem is kept between requests, so that each solve starts from
+       the previous ones (see DynamicVRPTW).
+    """
+
+    def __init__(self, espprc_cls, master_cls, limits):
+        self.espprc_cls = espprc_cls
+        self.master_cls = master_cls
+        self.limits = limits
+        self.problem = None
+
+    def handle(self, request):
+        """Returns the answer to 'request'."""
+
+        try:
+            op = request['op']
+            if op == 'load':
+                return self.load(request)
+            if self.problem is None:
+                raise ValueError("no instance loaded")
+            if op == 'add':
+                self.problem.add_customer(*request['customer'])
+            elif op == 'remove':
+                self.problem.remove_customer(request['id'])
+            elif op == 'window':
+                self.problem.set_time_window(request['id'], request['ready'],
+                                             request['due'])
+            elif op == 'demand':
+                self.problem.set_demand(request['id'], request['demand'])
+            elif op == 'vehicles':
+                self.problem.set_vehicles(request['vehicles'])
+            elif op == 'solve':
+                return self.solve(request.get('bb', False))
+            else:
+                raise ValueError(f"unknown op '{op}'")
+        except Exception as error:
+            # the service keeps running whatever the request
+            return {'ok': False, 'error': repr(error)}
+        return {'ok': True, 'customers': len(self.problem.lines) - 1}
+
+    def load(self, request):
+        options = {'master_cls': self.master_cls,
+                   'espprc_cls': self.espprc_cls}
+        if 'file' in request:
+            self.problem = DynamicVRPTW.from_file(request['file'], **options)
+        else:
+            self.problem = DynamicVRPTW(request['vehicles'],
+                                        request['capacity'],
+                                        request['customers'], **options)
+        self.problem.limits = self.limits
+        return {'ok': True, 'customers': len(self.problem.lines) - 1}
+
+    def solve(self, bb):
+        """Solves the problem and returns the answer: its 'status',
+           'optimal', 'infeasible' or 'stopped' (by a column generation
+           limit), the 'objective', the 'bound', the 'routes' used, as lists
+           of customer ids with their values, and the statistics of the
+           solve (see 'DynamicVRPTW.solve')."""
+
+        results = self.problem.solve(bb)
+        answer = {'ok': True, 'status': 'infeasible'}
+        if results:
+            obj, paths, bound = results
+            answer.update(status='optimal' if bound >= obj - 1e-6
+                          else 'stopped',
+                          objective=obj, bound=bound,
+                          routes=[[list(path), value]
+                                  for path, cost, value in paths])
+        answer.update(self.problem.stats)
+        return answer
+
+def serve(service, input_file, output_file):
+    """Answers the requests read from the text file object 'input_file', one
+       JSON object on each line, with a JSON line each on 'output_file'."""
+
+    for line in input_file:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            answer = {'ok': False, 'error': repr(error)}
+        else:
+            answer = service.handle(request)
+        output_file.write(json.dumps(answer) + '\n')
+        output_file.flush()
+
+class Handler(socketserver.StreamRequestHandler):
+    """A connection to the Unix socket, served like the standard input."""
+
+    def handle(self):
+        serve(self.server.service, io.TextIOWrapper(self.rfile),
+              io.TextIOWrapper(self.wfile, write_through=True))
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description=('Keep a VRPTW solved while its'
+                               ' customers change: read requests as JSON'
+                               ' lines and answer each one with a JSON'
+                               ' line.'))
+    parser.add_argument('--socket', metavar='PATH', help=('Serve the'
+                        ' requests on the Unix socket PATH, one connection'
+                        ' at a time, instead of the standard input'))
+    arguments.add_solver(parser)
+    arguments.add_lp(parser)
+    arguments.add_max_age(parser)
+    parser.add_argument('--time-limit', type=float, help=('Stop column'
+                        ' generation after this many seconds'))
+    arguments.add_gap(parser)
+    args = parser.parse_args()
+
+    limits = {'max_age': args.max_age, 'time_limit': args.time_limit,
+              'max_gap': args.gap}
+    service = Service(SOLVERS[args.solver], BACKENDS[args.lp], limits)
+    if args.socket is None:
+        serve(service, sys.stdin, sys.stdout)
+    else:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        with socketserver.UnixStreamServer(args.socket, Handler) as server:
+            server.service = service
+            server.serve_forever()
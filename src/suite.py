@@ -0,0 +1,272 @@
+import argparse as ap
+import json
+import os
+import tracemalloc
+from time import perf_counter
+
+from Generator import generate
+from Master import BACKENDS
+from Pricing import SOLVERS
+import arguments
+
+# the generated instances of the suite: kind, time windows and number of
+# customers, sized so that each one is solved in a few seconds
+SUITE = (('random', 'tight', 40), ('random', 'wide', 20),
+         ('clustered', 'tight', 30), ('clustered', 'wide', 12),
+         ('mixed', 'tight', 40), ('mixed', 'wide', 15))
+BASELINE = os.path.normpath(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'benchmarks', 'baseline.json'))
+# the fields of the records and the width of their columns in the report
+FIELDS = (('time', 13), ('memory', 14), ('labels', 9), ('iterations', 10),
+          ('objective', 12))
+# time differences smaller than this are noise (scheduling, caches, the
+# garbage collector), whatever their relative size, with the best of 3 runs;
+# with fewer runs the best time is noisier, and the floor grows accordingly
+MIN_TIME = 0.05
+DEFAULT_REPEAT = 3
+
+def time_floor(repeat):
+    """Returns the smallest time increase reported as a regression when
+       the best of 'repeat' runs is kept."""
+
+    return MIN_TIME * max(1, DEFAULT_REPEAT / repeat)
+
+def measure(setup, run, repeat):
+    """Calls 'run' on what 'setup' returns, 'repeat' times to time it, and
+       once more to measure the peak memory allocated by Python while it
+       runs (not the memory of the LP solvers), since tracing allocations
+       slows it down. Setting up is neither timed nor traced.
+
+       Returns:
+           The result of 'run', the best of its times and its peak memory,
+           in bytes.
+    """
+
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = perf_counter()
+        result = run(state)
+        times.append(perf_counter() - start)
+    state = setup()
+    tracemalloc.start()
+    try:
+        run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, min(times), peak
+
+def labels_created(espprc):
+    return sum(espprc.label_stats['created'])
+
+def pricing_benchmarks(spec, names, master_cls, repeat):
+    """Solves, with each of the pricing solvers 'names', the ESPPRC given
+       by the duals of the first master problem LP of the instance 'spec'.
+
+       Returns:
+           A record for each solver, with its time, peak memory, labels
+           created and restarts (as 'iterations') and the lowest reduced
+           cost found (as 'objective').
+    """
+
+    vrptw = generate(*spec)
+    vrptw.init_model(master_cls)
+    vrptw.master.optimize()
+    duals = vrptw.espprc_duals(vrptw.master.duals())
+
+    def setup(espprc_cls):
+        vrptw.set_espprc_solver(espprc_cls)
+        vrptw.espprc.duals[:] = duals
+        vrptw.espprc.reset_label_stats()
+        return vrptw.espprc
+
+    def run(espprc):
+        labels = espprc.solve()
+        return {'labels': labels_created(espprc),
+                'iterations': espprc.label_stats['restarts'],
+                'objective': min((label.cost for label in labels),
+                                 default=None)}
+
+    records = []
+    for name in names:
+        result, time, memory = measure(lambda: setup(SOLVERS[name]), run,
+                                       repeat)
+        records.append(dict(benchmark=f"pricing {name}", time=time,
+                            memory=memory, **result))
+    return records
+
+def column_generation_benchmark(spec, name, master_cls, repeat):
+    """Solves the column generation of the instance 'spec' with the pricing
+       solver 'name'.
+
+       Returns:
+           A record with its time, peak memory, labels created, pricing
+           iterations and objective.
+    """
+
+    def setup():
+        vrptw = generate(*spec)
+        vrptw.init_model(master_cls)
+        vrptw.set_espprc_solver(SOLVERS[name])
+        vrptw.espprc.reset_label_stats()
+        return vrptw
+
+    def run(vrptw):
+        obj, paths, bound = vrptw.solve()
+        return {'labels': labels_created(vrptw.espprc),
+                'iterations': vrptw.stats['iterations'], 'objective': obj}
+
+    result, time, memory = measure(setup, run, repeat)
+    return dict(benchmark=f"column generation {name}", time=time,
+                memory=memory, **result)
+
+def run_suite(specs, pricing, solver, master_cls, repeat):
+    """Runs the benchmarks on the instances 'specs', printing each record
+       as soon as it's available.
+
+       Returns:
+           The list of the records.
+    """
+
+    records = []
+    for spec in specs:
+        n_customers, kind, windows, seed = spec
+        instance = f"{kind}-{windows}-{n_customers}-{seed}"
+        new_records = pricing_benchmarks(spec, pricing, master_cls, repeat)
+        new_records.append(column_generation_benchmark(spec, solver,
+                                                       master_cls, repeat))
+        for record in new_records:
+            record['instance'] = instance
+            records.append(record)
+            print(format_record(record), flush=True)
+    return records
+
+def format_value(field, value):
+    if value is None:
+        return '-'
+    if field == 'time':
+        return f"{value:.3f}s"
+    if field == 'memory':
+        return f"{value / 2**20:.2f}MB"
+    if field == 'objective':
+        return f"{value:.4f}"
+    return str(value)
+
+def format_record(record, baseline=None):
+    """Returns a line of the report with the fields of 'record' and, if
+       'baseline' is given, the ratio of its time and memory to the ones of
+       'baseline' and the baseline values of its other fields that
+       differ."""
+
+    line = f"{record['instance']:<20} {record['benchmark']:<24}"
+    for field, width in FIELDS:
+        value = format_value(field, record[field])
+        if baseline is None:
+            pass
+        elif field in ('time', 'memory'):
+            value += f" x{record[field] / max(baseline[field], 1e-9):.2f}"
+        elif baseline[field] != record[field]:
+            value += f" ({format_value(field, baseline[field])})"
+        line += f" {value:>{width}}"
+    return line
+
+def regressions(records, baseline, tolerance, repeat=DEFAULT_REPEAT):
+    """Compares 'records' with the 'baseline' ones of the same instance and
+       benchmark, printing both.
+
+       Returns:
+           The list of the problems found: changed objectives, peak memory
+           more than 'tolerance' (relative) over the baseline, and times
+           both more than 'tolerance' over the baseline and longer by more
+           than the noise of the best of 'repeat' runs (see 'time_floor').
+    """
+
+    floor = time_floor(repeat)
+
+    baseline = {(record['instance'], record['benchmark']): record
+                for record in baseline}
+    problems = []
+    for record in records:
+        key = (record['instance'], record['benchmark'])
+        if key not in baseline:
+            print(f"{format_record(record)}  (not in baseline)")
+            continue
+        old = baseline[key]
+        print(format_record(record, old))
+        name = ' '.join(key)
+        if (old['objective'] is None) != (record['objective'] is None) or (
+                old['objective'] is not None
+                and abs(record['objective'] - old['objective'])
+                    > 1e-6 * max(1, abs(old['objective']))):
+            problems.append(f"{name}: objective {record['objective']}"
+                            f" instead of {old['objective']}")
+        if (record['time'] > old['time'] * (1 + tolerance)
+                and record['time'] - old['time'] > floor):
+            problems.append(f"{name}: {record['time']:.3f}s instead of"
+                            f" {old['time']:.3f}s")
+        if record['memory'] > old['memory'] * (1 + tolerance):
+            problems.append(f"{name}: peak memory {record['memory']}"
+                            f" instead of {old['memory']}")
+    return problems
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description=('Benchmark the pricing solvers'
+                               ' and column generation on generated'
+                               ' instances and compare them with a'
+                               ' baseline.'))
+    parser.add_argument('--pricing', choices=SOLVERS, nargs='*',
+                        default=list(SOLVERS), help=('Pricing solvers'
+                        ' benchmarked on the duals of the first LP'))
+    arguments.add_solver(parser,
+                         help='Pricing solver of column generation')
+    arguments.add_lp(parser, default='highs', help=('Specify the LP solver'
+                     ' of the master problem (the stored baseline uses'
+                     ' HiGHS)'))
+    parser.add_argument('--customers', type=int, help=('Number of customers'
+                        ' of every instance, instead of the suite sizes'))
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the instance generator')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=('Times each benchmark is run (the best time is'
+                              ' kept); with fewer than 3 runs only larger'
+                              ' time increases are reported'))
+    parser.add_argument('--baseline', default=BASELINE, help=('Baseline'
+                        ' results file'))
+    parser.add_argument('--save', action='store_true', help=('Save the'
+                        ' results as the new baseline instead of comparing'
+                        ' them with it'))
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help=('Relative increase of time or memory over the'
+                              ' baseline reported as a regression (time'
+                              f' increases under {MIN_TIME}s are ignored)'))
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    specs = [(args.customers or customers, kind, windows, args.seed)
+             for kind, windows, customers in SUITE]
+    options = {'solver': args.solver, 'lp': args.lp}
+    baseline = None
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['options'] != options:
+            print(f"warning: the baseline was run with {baseline['options']}")
+
+    records = run_suite(specs, args.pricing, args.solver,
+                        BACKENDS[args.lp], args.repeat)
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({'options': options, 'records': records}, baseline_file,
+                      indent=1)
+        print(f"baseline saved to {args.baseline}")
+    elif baseline is not None:
+        print("\ncompared with the baseline:")
+        problems = regressions(records, baseline['records'], args.tolerance,
+                               args.repeat)
+        for problem in problems:
+            print(problem)
+        if problems:
+            raise SystemExit(1)
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+
+# the modules of the solver import each other as top level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+
+from Generator import generate, generate_data
+
+# small instances, whose elementary paths can all be enumerated
+INSTANCES = [(8, 'random', 'wide', 0), (8, 'clustered', 'wide', 1),
+             (9, 'mixed', 'tight', 2)]
+
+def random_duals(vrptw, seed):
+    """Returns duals that make many paths price out: each customer pays
+       about the cost of its round trip from the depot."""
+
+    rng = np.random.default_rng(seed)
+    duals = 2 * vrptw.costs[0] * rng.uniform(0.4, 1.2, len(vrptw.customers))
+    duals[0] = -rng.uniform(0, vrptw.costs[0].mean())
+    return duals
+
+def elementary_paths(spec, duals):
+    """Returns a dictionary with the reduced cost of each elementary path
+       of the instance 'spec' that respects the capacity and the original
+       (not tightened) time windows, found by enumerating all of them."""
+
+    vehicles, capacity, data = generate_data(*spec)
+    costs = generate(*spec).costs
+    demands, ready, due, service = data[:, 3:7].T
+    paths = {}
+
+    def visit(path, load, time, cost):
+        last = path[-1]
+        for next in range(len(data)):
+            if next in path[1:]:
+                continue
+            arrival = max(time + service[last] + costs[last, next],
+                          ready[next])
+            new_load = load + demands[next]
+            if arrival > due[next] or new_load > capacity:
+                continue
+            new_cost = cost + costs[last, next] - duals[last]
+            if next == 0:
+                if len(path) > 1:
+                    paths[tuple(path) + (0,)] = new_cost
+            else:
+                visit(path + [next], new_load, arrival, new_cost)
+
+    visit([0], 0, ready[0], 0)
+    return paths
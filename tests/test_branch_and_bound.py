@@ -0,0 +1,92 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+import BB
+from BB import BBNode
+
+highspy = pytest.importorskip('highspy')
+
+import batch
+from Generator import generate, generate_data, write
+from Master import HighsMaster
+from Trace import Tracer
+from DSSR_ESPPRC import DSSR_ESPPRC
+
+class SharingNode(BBNode):
+    def __init__(self):
+        self.received = []
+
+    def receive(self, shared):
+        self.received.extend(shared)
+
+    def solve(self, cutoff):
+        pass
+
+def test_workers_receive_only_the_new_columns():
+    shared = ['a', 'b']
+    BB.init_worker(shared, None, ())
+    assert BB.solve_bbnode(SharingNode(), 0).received == ['a', 'b']
+    shared.append('c')
+    assert BB.solve_bbnode(SharingNode(), 0).received == ['c']
+    assert BB.solve_bbnode(SharingNode(), 0).received == []
+
+def bb_solved(processes):
+    vrptw = generate(15, 'clustered', 'tight', 2)
+    vrptw.init_model(HighsMaster)
+    vrptw.set_espprc_solver(DSSR_ESPPRC)
+    return vrptw.bb_solve(processes)
+
+def test_parallel_branch_and_bound():
+    assert bb_solved(2).obj == pytest.approx(bb_solved(1).obj)
+
+def test_batch_time_limit_bounds_the_whole_search(tmp_path):
+    instance = tmp_path / 'clustered.txt'
+    with open(instance, 'w') as instance_file:
+        write(instance_file, *generate_data(15, 'clustered', 'tight', 2))
+    options = {'solver': 'dssr', 'lp': 'highs', 'bb': True,
+               'strategy': 'best', 'time_limit': None, 'gap': None,
+               'cache': None, 'distances': 'float64'}
+    optimal = batch.solve_instance(str(instance), options)
+    assert optimal['status'] == 'optimal'
+    assert optimal['bound'] == pytest.approx(optimal['objective'])
+
+    options['time_limit'] = 0.05
+    stopped = batch.solve_instance(str(instance), options)
+    assert stopped['status'] == 'stopped'
+    assert stopped['bound'] <= optimal['objective'] + 1e-6
+    assert stopped['time'] < optimal['time']
+
+def test_trace_of_the_branch_and_price():
+    trace = io.StringIO()
+    vrptw = generate(15, 'clustered', 'tight', 2)
+    vrptw.tracer = Tracer(trace)
+    vrptw.init_model(HighsMaster)
+    vrptw.set_espprc_solver(DSSR_ESPPRC)
+    best = vrptw.bb_solve()
+    events = [json.loads(line) for line in trace.getvalue().splitlines()]
+    nodes = [event for event in events if event['event'] == 'node']
+    assert len(nodes) > 1
+    assert all(isinstance(node['integer'], bool)
+               and isinstance(node['pruned'], bool) for node in nodes)
+    integer = [node['objective'] for node in nodes if node['integer']]
+    assert min(integer) == pytest.approx(best.obj)
+
+def test_trace_numpy_scalars():
+    trace = io.StringIO()
+    Tracer(trace).event('test', flag=np.bool_(True), value=np.float32(0.5))
+    event = json.loads(trace.getvalue())
+    assert event['flag'] is True and event['value'] == 0.5
+
+def test_integer_nodes_stopped_early_keep_their_bound():
+    vrptw = generate(20, 'clustered', 'tight', 0)
+    vrptw.max_iterations = 1
+    vrptw.init_model(HighsMaster)
+    vrptw.set_espprc_solver(DSSR_ESPPRC)
+    best = vrptw.bb_solve()
+    # the optimum, found without the limit, is 333.67
+    assert best.obj >= 333.6678 - 1e-6
+    assert vrptw.bb_bound <= 333.6678 + 1e-6
+    assert vrptw.bb_bound < best.obj
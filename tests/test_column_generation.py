@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+highspy = pytest.importorskip('highspy')
+
+from Construction import initial_routes
+from Dynamic import DynamicVRPTW
+from Generator import generate, generate_data, write
+from Loader import load
+from Master import HighsMaster
+from ESPPRC import ESPPRC
+from BD_ESPPRC import BD_ESPPRC
+from DSSR_ESPPRC import DSSR_ESPPRC
+from NG_SPPRC import NG_SPPRC
+
+SOLVERS = [(ESPPRC, {}), (BD_ESPPRC, {}), (DSSR_ESPPRC, {}),
+           (NG_SPPRC, {'grow': True})]
+
+def solved(spec, espprc_cls, kwargs={}, **limits):
+    vrptw = generate(*spec)
+    for limit, value in limits.items():
+        setattr(vrptw, limit, value)
+    vrptw.init_model(HighsMaster)
+    vrptw.set_espprc_solver(espprc_cls, **kwargs)
+    return vrptw, vrptw.solve()
+
+@pytest.mark.parametrize('espprc_cls,kwargs', SOLVERS)
+def test_lagrangian_bounds_stay_below_the_optimum(espprc_cls, kwargs):
+    vrptw, (obj, paths, bound) = solved((20, 'random', 'tight', 0),
+                                        espprc_cls, kwargs)
+    assert bound == obj
+    assert max(vrptw.bounds) <= obj + 1e-6
+
+@pytest.mark.parametrize('espprc_cls,kwargs', SOLVERS)
+def test_elementary_solvers_agree(espprc_cls, kwargs):
+    reference = solved((20, 'mixed', 'tight', 1), ESPPRC)[1][0]
+    obj = solved((20, 'mixed', 'tight', 1), espprc_cls, kwargs)[1][0]
+    assert obj == pytest.approx(reference)
+
+def test_gap_stops_column_generation_with_a_valid_bound():
+    spec = (25, 'random', 'tight', 1)
+    optimum = solved(spec, ESPPRC)[1][0]
+    vrptw, (obj, paths, bound) = solved(spec, DSSR_ESPPRC, max_gap=0.2)
+    assert bound <= optimum + 1e-6 <= obj + 2e-6
+    assert obj - bound <= 0.2 * obj
+
+def fleet_limited(vehicles, construct=True):
+    vrptw = generate(25, 'random', 'tight', 0)
+    vrptw.vehicles = vehicles
+    vrptw.init_model(HighsMaster, construct)
+    vrptw.set_espprc_solver(DSSR_ESPPRC)
+    return vrptw
+
+@pytest.mark.parametrize('construct', [True, False])
+def test_fleet_smaller_than_the_initial_routes(construct):
+    vrptw = fleet_limited(8, construct)
+    assert len(initial_routes(vrptw)) > 8
+    obj, paths, bound = vrptw.solve()
+    assert obj == pytest.approx(877.6925)
+    assert sum(value for path, cost, value in paths) <= 8 + 1e-6
+    assert vrptw.infeasibility() <= 1e-6
+    assert vrptw.bb_solve().obj == pytest.approx(891.7170)
+
+@pytest.mark.parametrize('max_iterations', [1, 2, 3])
+def test_nodes_stopped_in_phase_one_stay_open(max_iterations):
+    vrptw = fleet_limited(8)
+    vrptw.max_iterations = max_iterations
+    assert vrptw.bb_solve().obj == pytest.approx(891.7170)
+    assert vrptw.bb_bound <= 891.7170
+
+def test_phase_one_goes_on_from_the_paths_found():
+    vrptw = fleet_limited(8)
+    vrptw.max_iterations = 1
+    obj, paths, bound = vrptw.solve()
+    assert obj == np.inf and paths == []
+    assert vrptw.pool
+    vrptw.max_iterations = None
+    assert vrptw.solve()[0] == pytest.approx(877.6925)
+
+def test_too_small_fleet_is_infeasible():
+    vrptw = fleet_limited(7)
+    assert vrptw.solve() is None
+    assert vrptw.bb_solve() is None
+
+def test_dynamic_fleet_smaller_than_the_initial_routes():
+    vehicles, capacity, data = generate_data(25, 'random', 'tight', 0)
+    dynamic = DynamicVRPTW(8, capacity, data, HighsMaster)
+    assert dynamic.solve()[0] == pytest.approx(877.6925)
+    dynamic.set_vehicles(7)
+    assert dynamic.solve() is None
+    dynamic.set_vehicles(8)
+    assert dynamic.solve()[0] == pytest.approx(877.6925)
+    assert dynamic.stats['warm']
+
+@pytest.mark.parametrize('espprc_cls,kwargs', SOLVERS)
+def test_integer_distances(espprc_cls, kwargs):
+    # no window is tightened, so that all of the times are integers
+    spec = (12, 'random', 'tight', 2)
+    vrptw = generate(*spec, distances='int')
+    assert vrptw.preprocessing_stats['windows'] == 0
+    vrptw.init_model(HighsMaster)
+    vrptw.set_espprc_solver(espprc_cls, **kwargs)
+    assert vrptw.solve()[0] == pytest.approx(478)
+    assert vrptw.bb_solve().obj == pytest.approx(478)
+
+def test_dynamic_resolve_with_column_aging():
+    vehicles, capacity, data = generate_data(25, 'random', 'tight', 0)
+    dynamic = DynamicVRPTW(vehicles, capacity, data, HighsMaster)
+    dynamic.limits = {'max_age': 1}
+    dynamic.solve()
+    assert dynamic.pool
+    # the paths of the pool are kept, and can go back to the master
+    dynamic.set_time_window(3, *data[3][4:6])
+    dynamic.remove_customer(5)
+    obj = dynamic.solve()[0]
+    scratch = DynamicVRPTW(vehicles, capacity, data, HighsMaster)
+    scratch.remove_customer(5)
+    assert obj == pytest.approx(scratch.solve()[0])
+
+def test_dynamic_from_file_keeps_the_loaded_distances(tmp_path):
+    instance_file = tmp_path / 'instance.txt'
+    with open(instance_file, 'w') as output_file:
+        write(output_file, *generate_data(25, 'random', 'tight', 0))
+    dynamic = DynamicVRPTW.from_file(instance_file, master_cls=HighsMaster)
+    costs = load(instance_file)[3]
+    assert np.array_equal(dynamic.distances, costs)
+    # the customers added later get their distances to the loaded ones
+    dynamic.add_customer(26, 10, 20, 5, 0, 1000, 10)
+    assert dynamic.distances.shape == (27, 27)
+    assert np.array_equal(dynamic.distances[:26, :26], costs)
+    assert dynamic.distances[26, 0] == pytest.approx(
+        np.hypot(*np.subtract([10, 20], dynamic.lines[0][1:3])))
+    dynamic.remove_customer(26)
+    vehicles, capacity, data = generate_data(25, 'random', 'tight', 0)
+    scratch = DynamicVRPTW(vehicles, capacity, data, HighsMaster)
+    assert dynamic.solve()[0] == pytest.approx(scratch.solve()[0])
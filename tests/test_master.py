@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from Master import Master
+
+highspy = pytest.importorskip('highspy')
+
+from Master import HighsMaster
+
+def test_master_is_abstract():
+    with pytest.raises(TypeError):
+        Master(3, 2)
+
+def test_costs_are_floats():
+    master = HighsMaster(3, 2)
+    columns = [master.add_column(np.float64(2), [1], [1]),
+               master.add_column(np.int64(3), [2], [1])]
+    assert master.optimize()
+    costs = master.costs(columns)
+    assert costs == [2, 3]
+    assert all(type(cost) is float for cost in costs)
+
+def test_infeasible_model():
+    master = HighsMaster(3, 1)
+    for row in (1, 2):
+        master.add_column(1, [0, row, 3], [1, 1, 1])
+    assert not master.optimize()
+    master.set_vehicles(0, 2)
+    assert master.optimize()
+    assert master.objective() == pytest.approx(2)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from Generator import generate, generate_data
+from VRPTW import Customer, VRPTW
+from ESPPRC import ESPPRC
+from BD_ESPPRC import BD_ESPPRC
+from conftest import INSTANCES, elementary_paths, random_duals
+
+def customers_of(data):
+    return [Customer(int(line[0]), np.array(line[1:3]), line[3], line[4:6],
+                     line[6])
+            for line in data.tolist()]
+
+def test_windows_are_tightened_on_copies():
+    vehicles, capacity, data = generate_data(25, 'random', 'wide', 0)
+    customers = customers_of(data)
+    windows = [list(customer.time_window) for customer in customers]
+    first = VRPTW(vehicles, capacity, customers)
+    second = VRPTW(vehicles, capacity, customers)
+    assert first.preprocessing_stats['windows'] > 0
+    assert [list(customer.time_window) for customer in customers] == windows
+    assert first.raw_windows == second.raw_windows == windows
+    assert ([customer.time_window for customer in first.customers]
+            == [customer.time_window for customer in second.customers])
+    assert (first.arcs == second.arcs).all()
+
+@pytest.mark.parametrize('spec', INSTANCES)
+@pytest.mark.parametrize('espprc_cls', [ESPPRC, BD_ESPPRC])
+def test_float32_times_keep_the_cheapest_path(spec, espprc_cls):
+    vrptw = generate(*spec, distances='float32')
+    duals = random_duals(vrptw, 0)
+    paths = elementary_paths(spec, duals)
+    vrptw.set_espprc_solver(espprc_cls)
+    vrptw.espprc.duals[:] = duals
+    labels = vrptw.espprc.solve()
+    assert labels[0].cost == pytest.approx(min(paths.values()), rel=1e-5)
+
+def test_arc_tolerance_follows_the_precision_of_the_times():
+    # the arc from 1 to 2 misses the due date of 2 by about 1e-4, which is
+    # within the rounding error of float32 times but not of float64 ones
+    data = np.array([[0, 0, 0, 0, 0, 1000, 0], [1, 0, 0, 1, 500, 510, 0],
+                     [2, 0, 0, 1, 550, 600.0999, 0]])
+    times = np.array([[0, 10, 10], [10, 0, 100.1], [10, 100.1, 0]],
+                     dtype=np.float32)
+    float32 = VRPTW.from_data(2, 10, data, times)
+    float64 = VRPTW.from_data(2, 10, data, times.astype(float))
+    assert float32.arcs[1, 2]
+    assert not float64.arcs[1, 2]
@@ -0,0 +1,77 @@
+import pytest
+
+from Generator import generate
+from ESPPRC import ESPPRC
+from BD_ESPPRC import BD_ESPPRC
+from DSSR_ESPPRC import DSSR_ESPPRC, find_repeated
+from NG_SPPRC import NG_SPPRC
+from conftest import INSTANCES, elementary_paths, random_duals
+
+def pricing_solver(spec, espprc_cls, duals, **kwargs):
+    vrptw = generate(*spec)
+    vrptw.set_espprc_solver(espprc_cls, **kwargs)
+    vrptw.espprc.duals[:] = duals
+    return vrptw.espprc
+
+def solve(spec, espprc_cls, duals, **kwargs):
+    """Returns the (path, cost) pairs of the labels found by the solver."""
+
+    labels = pricing_solver(spec, espprc_cls, duals, **kwargs).solve()
+    return [(tuple(customer.index for customer in label.path), label.cost)
+            for label in labels]
+
+@pytest.mark.parametrize('spec', INSTANCES)
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('espprc_cls,kwargs', [
+    (ESPPRC, {}), (ESPPRC, {'completion_bounds': False}), (BD_ESPPRC, {})])
+def test_exact_solvers_find_the_cheapest_path(spec, seed, espprc_cls, kwargs):
+    duals = random_duals(generate(*spec), seed)
+    paths = elementary_paths(spec, duals)
+    labels = solve(spec, espprc_cls, duals, **kwargs)
+    assert labels
+    assert labels[0][1] == pytest.approx(min(paths.values()))
+    for path, cost in labels:
+        assert cost == pytest.approx(paths[path])
+
+@pytest.mark.parametrize('spec', INSTANCES)
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('espprc_cls,kwargs', [
+    (DSSR_ESPPRC, {}), (DSSR_ESPPRC, {'critical_rule': 'most'}),
+    (NG_SPPRC, {'ng_size': 2, 'grow': True})])
+def test_relaxations_return_negative_elementary_paths(spec, seed, espprc_cls,
+                                                      kwargs):
+    duals = random_duals(generate(*spec), seed)
+    paths = elementary_paths(spec, duals)
+    labels = solve(spec, espprc_cls, duals, **kwargs)
+    assert min(paths.values()) < 0
+    assert labels and labels[0][1] < 0
+    for path, cost in labels:
+        assert not find_repeated(path[1:-1])
+        assert cost == pytest.approx(paths[path])
+
+@pytest.mark.parametrize('spec', INSTANCES)
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('espprc_cls,kwargs', [
+    (ESPPRC, {}), (BD_ESPPRC, {}), (DSSR_ESPPRC, {}),
+    (NG_SPPRC, {'ng_size': 2}), (NG_SPPRC, {'ng_size': 2, 'grow': True})])
+def test_min_reduced_cost_bounds_the_elementary_paths(spec, seed, espprc_cls,
+                                                      kwargs):
+    duals = random_duals(generate(*spec), seed)
+    cheapest = min(elementary_paths(spec, duals).values())
+    espprc = pricing_solver(spec, espprc_cls, duals, **kwargs)
+    min_cost = espprc.min_reduced_cost(espprc.solve())
+    assert min_cost <= cheapest + 1e-9
+    if espprc_cls in (ESPPRC, BD_ESPPRC):
+        assert min_cost == pytest.approx(cheapest)
+
+def test_cascade_skips_stages_without_new_paths():
+    spec = INSTANCES[0]
+    vrptw = generate(*spec)
+    vrptw.set_espprc_solver(ESPPRC, {'truncated': {'max_labels': 1}})
+    vrptw.espprc.duals[:] = random_duals(vrptw, 0)
+    labels = vrptw.pricing.solve()
+    assert vrptw.pricing.last_stage == 'truncated'
+    # as if the paths found by the heuristic were in the master already
+    known = {tuple(label.path) for label in labels}
+    vrptw.pricing.solve(lambda label: tuple(label.path) not in known)
+    assert vrptw.pricing.last_stage == 'exact'
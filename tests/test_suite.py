@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import suite
+from suite import regressions
+from Master import HighsMaster
+
+def record(time, memory=1000, objective=1.0):
+    return {'instance': 'random-tight-10-0', 'benchmark': 'pricing dssr',
+            'time': time, 'memory': memory, 'labels': 10, 'iterations': 0,
+            'objective': objective}
+
+def test_short_time_increases_are_noise():
+    assert not regressions([record(0.05)], [record(0.02)], 0.5)
+
+def test_time_increases_over_the_tolerance_and_the_floor():
+    assert regressions([record(0.4)], [record(0.2)], 0.5)
+    assert not regressions([record(0.28)], [record(0.2)], 0.5)
+
+def test_floor_grows_with_fewer_repeats():
+    assert regressions([record(0.32)], [record(0.2)], 0.5, repeat=3)
+    assert not regressions([record(0.32)], [record(0.2)], 0.5, repeat=1)
+
+def test_objective_and_memory_changes():
+    assert regressions([record(0.1, objective=2.0)], [record(0.1)], 0.5)
+    assert regressions([record(0.1, memory=2000)], [record(0.1)], 0.5)
+
+@pytest.mark.parametrize('kind, windows, customers', suite.SUITE)
+def test_deterministic_fields_match_the_baseline(kind, windows, customers,
+                                                 monkeypatch):
+    pytest.importorskip('highspy')
+    with open(suite.BASELINE) as baseline_file:
+        baseline = json.load(baseline_file)
+    assert baseline['options'] == {'solver': 'dssr', 'lp': 'highs'}
+    # labels, iterations and objectives don't depend on the run, so each
+    # benchmark is run once and not measured
+    monkeypatch.setattr(suite, 'measure',
+                        lambda setup, run, repeat: (run(setup()), 0, 0))
+    spec = (customers, kind, windows, 0)
+    records = suite.pricing_benchmarks(spec, suite.SOLVERS, HighsMaster, 1)
+    records.append(suite.column_generation_benchmark(spec, 'dssr',
+                                                     HighsMaster, 1))
+    instance = f"{kind}-{windows}-{customers}-0"
+    old = {record['benchmark']: record for record in baseline['records']
+           if record['instance'] == instance}
+    assert set(old) == {record['benchmark'] for record in records}
+    for record in records:
+        expected = old[record['benchmark']]
+        assert record['labels'] == expected['labels'], record['benchmark']
+        assert record['iterations'] == expected['iterations']
+        assert record['objective'] == pytest.approx(expected['objective'],
+                                                    rel=1e-9)